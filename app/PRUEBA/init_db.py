@@ -1,13 +1,12 @@
-from app.db.session import engine, Base
-# Importamos los modelos para que Base "sepa" que existen
-from app.models.movimiento import Movimiento
-from app.models.satisfaccion import MetricaSatisfaccion
+from app.db.session import obtener_engine
+# migraciones importa los modelos para que Base "sepa" que existen
+from app.db.migraciones import sincronizar_esquema
 
 def inicializar():
     print("--- Iniciando Sincronización de Base de Datos ---")
     try:
-        # Esta línea crea las tablas que falten en tu SQL Server
-        Base.metadata.create_all(bind=engine)
+        # Crea las tablas e índices que falten en la base configurada
+        sincronizar_esquema(obtener_engine())
         print("✅ Tablas creadas o actualizadas correctamente en SQL Server.")
     except Exception as e:
         print(f"❌ Error al conectar o crear tablas: {e}")
@@ -0,0 +1,54 @@
+import base64
+import io
+import os
+from functools import lru_cache
+
+CARPETA_CARITAS = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "assets", "caritas"))
+NIVELES = range(1, 11)
+# Las caritas se muestran a 40px; guardamos el doble para pantallas HiDPI
+TAMANO_CARITA = 80
+
+
+def _codificar_png(ruta, tamano):
+    with open(ruta, "rb") as img_file:
+        datos = img_file.read()
+    if tamano:
+        try:
+            from PIL import Image
+        except ImportError:
+            # Sin Pillow se sirve el PNG original, solo que sin reducir
+            return datos
+        imagen = Image.open(io.BytesIO(datos))
+        imagen.thumbnail((tamano, tamano))
+        salida = io.BytesIO()
+        imagen.save(salida, format="PNG", optimize=True)
+        datos = salida.getvalue()
+    return datos
+
+
+@lru_cache(maxsize=None)
+def cargar_caritas(tamano=TAMANO_CARITA):
+    """Lee y codifica las diez caritas una sola vez por proceso.
+
+    Devuelve {nivel: data URI}. Con `tamano=None` se conservan los PNG originales.
+    """
+    caritas = {}
+    for nivel in NIVELES:
+        ruta = os.path.join(CARPETA_CARITAS, f"carita{nivel}.PNG")
+        try:
+            datos = _codificar_png(ruta, tamano)
+        except OSError:
+            caritas[nivel] = ""
+            continue
+        caritas[nivel] = f"data:image/png;base64,{base64.b64encode(datos).decode()}"
+    return caritas
+
+
+def obtener_carita(nivel, tamano=TAMANO_CARITA):
+    """Data URI de la carita de un nivel, servido desde memoria."""
+    return cargar_caritas(tamano).get(nivel, "")
+
+
+def tamano_total_caritas(tamano=TAMANO_CARITA):
+    """Bytes que ocupan las caritas codificadas dentro de la página."""
+    return sum(len(uri) for uri in cargar_caritas(tamano).values())
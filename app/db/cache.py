@@ -0,0 +1,125 @@
+"""Cachés en memoria del proceso, con vencimiento (TTL) y tamaño máximo (LRU).
+
+Las comparten la API y Streamlit. Las rutas que escriben las invalidan
+después del commit (`registrar_escritura` para movimientos,
+`invalidar_categorias` para categorías). El TTL acota cuánto puede tardar en
+verse una escritura hecha desde otro proceso.
+
+    diagnosticos.obtener((umbral, desde, hasta), lambda: motor.calcular_costo_insatisfaccion(...))
+
+Los valores se comparten entre llamadas: quien los recibe no debe modificarlos.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+_caches = {}
+
+
+class CacheTTL:
+    """Caché LRU con TTL, segura entre hilos, con contadores de aciertos y fallos."""
+
+    def __init__(self, nombre, maximo=128, ttl=300.0, reloj=time.monotonic):
+        self.nombre = nombre
+        self.maximo = maximo
+        self.ttl = ttl
+        self._reloj = reloj
+        self._datos = OrderedDict() # clave -> (vence, valor); el final es lo más reciente
+        self._lock = threading.Lock()
+        # Sube con cada invalidación: un cálculo que empezó antes no se guarda
+        self._generacion = 0
+        self.aciertos = self.fallos = self.vencidos = self.desalojos = self.invalidaciones = 0
+
+    def _buscar(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is not None:
+                if entrada[0] > self._reloj():
+                    self._datos.move_to_end(clave)
+                    self.aciertos += 1
+                    return True, entrada[1], self._generacion
+                del self._datos[clave]
+                self.vencidos += 1
+            self.fallos += 1
+            return False, None, self._generacion
+
+    def _guardar(self, clave, valor, generacion):
+        with self._lock:
+            if generacion != self._generacion:
+                return # Hubo una escritura mientras se calculaba
+            self._datos[clave] = (self._reloj() + self.ttl, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maximo:
+                self._datos.popitem(last=False)
+                self.desalojos += 1
+
+    def obtener(self, clave, calcular):
+        """Valor guardado para `clave`, o `calcular()` (sin argumentos) si no hay o venció."""
+        encontrado, valor, generacion = self._buscar(clave)
+        if encontrado:
+            return valor
+        # Se calcula fuera del lock: otras claves no esperan a esta
+        valor = calcular()
+        self._guardar(clave, valor, generacion)
+        return valor
+
+    async def obtener_async(self, clave, calcular):
+        """Como `obtener`, para funciones async: `calcular()` devuelve un awaitable."""
+        encontrado, valor, generacion = self._buscar(clave)
+        if encontrado:
+            return valor
+        valor = await calcular()
+        self._guardar(clave, valor, generacion)
+        return valor
+
+    def invalidar(self, clave=None):
+        """Descarta una clave, o todo si no se indica."""
+        with self._lock:
+            self._generacion += 1
+            self.invalidaciones += 1
+            if clave is None:
+                self._datos.clear()
+            else:
+                self._datos.pop(clave, None)
+
+    def estadisticas(self):
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._datos),
+                "maximo": self.maximo,
+                "ttl": self.ttl,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": round(self.aciertos / consultas, 3) if consultas else 0.0,
+                "vencidos": self.vencidos,
+                "desalojos": self.desalojos,
+                "invalidaciones": self.invalidaciones,
+            }
+
+
+def crear_cache(nombre, maximo=128, ttl=300.0):
+    """Crea y registra una caché (para `invalidar` y `estadisticas`)."""
+    cache = CacheTTL(nombre, maximo, ttl)
+    _caches[nombre] = cache
+    return cache
+
+
+def invalidar(*nombres):
+    """Vacía las cachés indicadas, o todas."""
+    for nombre in nombres or list(_caches):
+        _caches[nombre].invalidar()
+
+
+def estadisticas():
+    """Contadores de todas las cachés registradas."""
+    return {nombre: cache.estadisticas() for nombre, cache in _caches.items()}
+
+
+# Cachés compartidas
+categorias = crear_cache("categorias", maximo=8, ttl=600.0)
+# Resultados del diagnóstico por (umbral, desde, hasta); dependen de los movimientos
+diagnosticos = crear_cache("diagnosticos", maximo=64, ttl=60.0)
+
+# Cachés que dependen de los movimientos (las vacía `registrar_escritura`)
+ANALISIS = ("diagnosticos",)
@@ -0,0 +1,114 @@
+"""Carga de movimientos como DataFrame tipado, sin pasar por objetos ORM.
+
+Un SELECT de Core (movimientos LEFT JOIN metricas_satisfaccion LEFT JOIN
+categorias) se ejecuta sobre la conexión de la sesión y cada columna se arma
+directamente con su dtype, sin inferencia de pandas:
+
+- tipo y categoria como `category` (las categorías salen de la tabla, así que
+  todos los bloques comparten el mismo dtype),
+- nivel como Int8 (nulo si el movimiento no tiene métrica),
+- monto en float64, o float32 con `monto_float32=True`.
+
+`iterar_movimientos` devuelve bloques de `tamano_bloque` filas para procesar
+ledgers grandes con memoria acotada.
+"""
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from app.models.movimiento import Categoria, Movimiento
+from app.models.satisfaccion import MetricaSatisfaccion
+
+TIPOS = ["GASTO", "INGRESO"]
+TAMANO_BLOQUE = 50_000
+
+_EXPRESIONES = {
+    "id": Movimiento.id,
+    "fecha": Movimiento.fecha,
+    "tipo": Movimiento.tipo,
+    "descripcion": Movimiento.descripcion,
+    "clave": Movimiento.clave_descripcion,
+    "monto": Movimiento.monto,
+    "categoria_id": Movimiento.categoria_id,
+    "categoria": Categoria.nombre,
+    "nivel": MetricaSatisfaccion.nivel,
+    "comentario": MetricaSatisfaccion.comentario,
+}
+COLUMNAS = tuple(c for c in _EXPRESIONES if c != "comentario")
+
+
+def consulta_movimientos(columnas=COLUMNAS, tipo=None, desde=None, hasta=None, condiciones=()):
+    """SELECT de Core con solo las columnas pedidas (y solo los JOIN que necesitan).
+
+    `condiciones` son cláusulas WHERE adicionales (p. ej. `Movimiento.id > n`).
+    """
+    desconocidas = set(columnas) - set(_EXPRESIONES)
+    if desconocidas:
+        raise ValueError(f"Columnas desconocidas: {sorted(desconocidas)}")
+    consulta = select(*(_EXPRESIONES[c].label(c) for c in columnas)).select_from(Movimiento)
+    if "nivel" in columnas or "comentario" in columnas:
+        consulta = consulta.outerjoin(MetricaSatisfaccion, MetricaSatisfaccion.movimiento_id == Movimiento.id)
+    if "categoria" in columnas:
+        consulta = consulta.outerjoin(Categoria, Categoria.id == Movimiento.categoria_id)
+    if tipo:
+        consulta = consulta.where(Movimiento.tipo == tipo)
+    if desde is not None:
+        consulta = consulta.where(Movimiento.fecha >= desde)
+    if hasta is not None:
+        consulta = consulta.where(Movimiento.fecha < hasta)
+    if condiciones:
+        consulta = consulta.where(*condiciones)
+    return consulta.order_by(Movimiento.id)
+
+
+def _columna(nombre, valores, categorias, monto_float32):
+    if nombre == "id":
+        return np.fromiter(valores, dtype=np.int64, count=len(valores))
+    if nombre == "monto":
+        return np.fromiter(valores, dtype=np.float32 if monto_float32 else np.float64, count=len(valores))
+    if nombre == "fecha":
+        return pd.to_datetime(pd.Series(valores, dtype=object))
+    if nombre in ("tipo", "categoria"):
+        dtype = pd.CategoricalDtype(TIPOS if nombre == "tipo" else categorias)
+        return pd.Series(np.array(valores, dtype=object), dtype=object).astype(dtype)
+    if nombre == "categoria_id":
+        return pd.array(valores, dtype="Int32")
+    if nombre == "nivel":
+        return pd.array(valores, dtype="Int8")
+    return np.array(valores, dtype=object) # descripcion, clave, comentario
+
+
+def marco_movimientos(filas, columnas, categorias=None, monto_float32=False):
+    """DataFrame tipado a partir de filas (tuplas en el orden de `columnas`)."""
+    valores = list(zip(*filas)) if filas else [()] * len(columnas)
+    return pd.DataFrame({
+        nombre: _columna(nombre, columna, categorias, monto_float32)
+        for nombre, columna in zip(columnas, valores)
+    })
+
+
+def _categorias(db, columnas):
+    if "categoria" not in columnas:
+        return None
+    return db.execute(select(Categoria.nombre).order_by(Categoria.nombre)).scalars().all()
+
+
+def iterar_movimientos(db, columnas=COLUMNAS, tamano_bloque=TAMANO_BLOQUE, monto_float32=False, **filtros):
+    """Genera DataFrames de hasta `tamano_bloque` filas, en orden de id.
+
+    Los filtros (tipo, desde, hasta, condiciones) son los de `consulta_movimientos`.
+    """
+    columnas = tuple(columnas)
+    categorias = _categorias(db, columnas)
+    resultado = db.connection().execute(
+        consulta_movimientos(columnas, **filtros).execution_options(yield_per=tamano_bloque)
+    )
+    for filas in resultado.partitions():
+        yield marco_movimientos(filas, columnas, categorias, monto_float32)
+
+
+def cargar_movimientos_df(db, columnas=COLUMNAS, monto_float32=False, **filtros):
+    """Todos los movimientos (que cumplen los filtros) en un solo DataFrame tipado."""
+    columnas = tuple(columnas)
+    categorias = _categorias(db, columnas)
+    filas = db.connection().execute(consulta_movimientos(columnas, **filtros)).all()
+    return marco_movimientos(filas, columnas, categorias, monto_float32)
@@ -0,0 +1,23 @@
+"""Lecturas de categorías con caché: cambian muy poco y se piden en cada rerun."""
+from sqlalchemy import select
+from app.db import cache
+from app.models.movimiento import Categoria
+
+
+def listar_categorias(db, tipo=None):
+    """Filas (id, nombre, tipo) ordenadas por nombre; solo las de `tipo` si se indica."""
+    todas = cache.categorias.obtener(
+        "todas",
+        lambda: db.execute(select(Categoria.id, Categoria.nombre, Categoria.tipo).order_by(Categoria.nombre)).all(),
+    )
+    return todas if tipo is None else [c for c in todas if c.tipo == tipo]
+
+
+def ids_por_nombre(db):
+    """Mapa nombre -> id de todas las categorías."""
+    return cache.categorias.obtener("ids", lambda: {c.nombre: c.id for c in listar_categorias(db)})
+
+
+def invalidar_categorias():
+    """Llamar después del commit de cualquier alta, cambio o baja de categorías."""
+    cache.categorias.invalidar()
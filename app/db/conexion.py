@@ -1,6 +1,7 @@
-from sqlalchemy import create_engine
+from app.db.session import crear_engine
 
-def get_engine():
+def get_engine(url=None):
+    """Engine para la instancia local de SQL Server (usa la fábrica común de session.py)."""
     server = "DESKTOP-28LC7MC\\SQLEXPRESS"
     database = "GestorFinanzas"
 
@@ -10,8 +11,7 @@ def get_engine():
         "&trusted_connection=yes"
     )
 
-    engine = create_engine(connection_string)
-    return engine
+    return crear_engine(url or connection_string)
 if __name__ == "__main__":
     engine = get_engine()
     with engine.connect() as conn:
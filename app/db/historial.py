@@ -0,0 +1,183 @@
+from collections import namedtuple
+from datetime import datetime
+from sqlalchemy import and_, bindparam, delete, or_, select, update
+from app.db.recurrencias import claves_de, recalcular_claves
+from app.db.resumen import ajustar_resumen
+from app.ia.normalizacion import normalizar_descripcion
+from app.models.movimiento import Categoria, Movimiento
+from app.models.satisfaccion import MetricaSatisfaccion
+
+# Columnas que el editor de "Gestionar Historial" permite modificar
+COLUMNAS_EDITABLES = ["Descripción", "Monto", "Tipo", "Satisfacción"]
+
+FilaHistorial = namedtuple(
+    "FilaHistorial", ["id", "fecha", "descripcion", "monto", "tipo", "categoria_id", "categoria", "nivel"]
+)
+
+# Columnas por las que se puede ordenar el historial; el desempate siempre es el id
+ORDENES = {
+    "fecha": Movimiento.fecha,
+    "monto": Movimiento.monto,
+    "satisfaccion": MetricaSatisfaccion.nivel,
+    "descripcion": Movimiento.descripcion,
+}
+_CAMPOS_ORDEN = {"satisfaccion": "nivel"} # Campo de FilaHistorial de cada orden
+_TIPOS_ORDEN = {"fecha": datetime.fromisoformat, "monto": float, "satisfaccion": int, "descripcion": str}
+LIMITE_PAGINA = 50
+LIMITE_MAXIMO = 500
+
+_movimientos = Movimiento.__table__
+_metricas = MetricaSatisfaccion.__table__
+
+
+def detectar_cambios(df_original, df_editado):
+    """Devuelve las filas editadas que difieren del original (una sola comparación).
+
+    Las filas se alinean por "ID", así que el orden del editor no importa.
+    """
+    original = df_original.set_index("ID")[COLUMNAS_EDITABLES]
+    editado = df_editado.set_index("ID")[COLUMNAS_EDITABLES].reindex(original.index)
+    distinto = (original != editado) & ~(original.isna() & editado.isna())
+    return editado[distinto.any(axis=1)].reset_index()
+
+
+def consulta_historial(desde=None, hasta=None, tipo=None, categoria_id=None, nivel_min=None, nivel_max=None,
+                       texto=None):
+    """SELECT del historial con los filtros aplicados en la base."""
+    consulta = (
+        select(
+            Movimiento.id, Movimiento.fecha, Movimiento.descripcion, Movimiento.monto, Movimiento.tipo,
+            Movimiento.categoria_id, Categoria.nombre, MetricaSatisfaccion.nivel,
+        )
+        .join(MetricaSatisfaccion, MetricaSatisfaccion.movimiento_id == Movimiento.id)
+        .outerjoin(Categoria, Categoria.id == Movimiento.categoria_id)
+    )
+    if desde is not None:
+        consulta = consulta.where(Movimiento.fecha >= desde)
+    if hasta is not None:
+        consulta = consulta.where(Movimiento.fecha < hasta)
+    if tipo:
+        consulta = consulta.where(Movimiento.tipo == tipo)
+    if categoria_id is not None:
+        consulta = consulta.where(Movimiento.categoria_id == categoria_id)
+    if nivel_min is not None:
+        consulta = consulta.where(MetricaSatisfaccion.nivel >= nivel_min)
+    if nivel_max is not None:
+        consulta = consulta.where(MetricaSatisfaccion.nivel <= nivel_max)
+    if texto:
+        consulta = consulta.where(Movimiento.descripcion.icontains(texto.strip(), autoescape=True))
+    return consulta
+
+
+def paginar(db, consulta, columna, limite, cursor=None, descendente=True):
+    """Paginación por clave (`columna`, id) sobre cualquier SELECT del historial.
+
+    `cursor` es ese par para la última fila de la página anterior, así cada
+    página cuesta lo mismo sin importar cuántas filas hay antes. Devuelve
+    (filas, hay_mas).
+    """
+    if descendente:
+        consulta = consulta.order_by(columna.desc(), Movimiento.id.desc())
+    else:
+        consulta = consulta.order_by(columna, Movimiento.id)
+    if cursor is not None:
+        valor, id_ = cursor
+        if descendente:
+            consulta = consulta.where(or_(columna < valor, and_(columna == valor, Movimiento.id < id_)))
+        else:
+            consulta = consulta.where(or_(columna > valor, and_(columna == valor, Movimiento.id > id_)))
+    # Pedimos una fila extra solo para saber si hay otra página
+    filas = db.execute(consulta.limit(limite + 1)).all()
+    return filas[:limite], len(filas) > limite
+
+
+def pagina_historial(db, limite=LIMITE_PAGINA, cursor=None, orden="fecha", descendente=True, **filtros):
+    """Una página del historial, filtrada y ordenada en la base.
+
+    Paginación por clave (valor de `orden`, id, ver `paginar`). Devuelve
+    (filas, siguiente_cursor); el cursor es None cuando no quedan más filas.
+    Los filtros son los de `consulta_historial`.
+    """
+    if orden not in ORDENES:
+        raise ValueError(f"orden debe ser uno de {sorted(ORDENES)}, no {orden!r}")
+    limite = min(max(int(limite), 1), LIMITE_MAXIMO)
+
+    filas, hay_mas = paginar(db, consulta_historial(**filtros), ORDENES[orden], limite, cursor, descendente)
+    filas = [FilaHistorial(*f) for f in filas]
+    if hay_mas:
+        ultima = filas[-1]
+        return filas, (getattr(ultima, _CAMPOS_ORDEN.get(orden, orden)), ultima.id)
+    return filas, None
+
+
+def codificar_cursor(cursor):
+    """Cursor como texto para la API: "<valor>|<id>"."""
+    if cursor is None:
+        return None
+    valor, id_ = cursor
+    valor = valor.isoformat() if isinstance(valor, datetime) else valor
+    return f"{valor}|{id_}"
+
+
+def decodificar_cursor(texto, orden="fecha"):
+    """Inverso de `codificar_cursor`; ValueError si el texto no es válido."""
+    if not texto:
+        return None
+    valor, separador, id_ = texto.rpartition("|")
+    if not separador:
+        raise ValueError(f"Cursor inválido: {texto!r}")
+    return _TIPOS_ORDEN[orden](valor), int(id_)
+
+
+def guardar_cambios(db, cambios):
+    """Aplica los cambios con dos UPDATE masivos (executemany) y devuelve cuántas filas cambiaron.
+
+    No hace commit: la transacción es del llamador. El resumen mensual y el
+    detector de recurrentes se ajustan en la misma transacción.
+    """
+    if cambios.empty:
+        return 0
+
+    ids = cambios["ID"].astype(int).tolist()
+    claves = claves_de(db, ids)
+    with ajustar_resumen(db, ids):
+        _actualizar(db, ids, cambios)
+    recalcular_claves(db, claves | claves_de(db, ids))
+    return len(ids)
+
+
+def _actualizar(db, ids, cambios):
+    db.execute(
+        update(_movimientos).where(_movimientos.c.id == bindparam("b_id")),
+        [
+            {
+                "b_id": id_,
+                "descripcion": desc,
+                "clave_descripcion": normalizar_descripcion(desc),
+                "monto": float(monto),
+                "tipo": tipo,
+            }
+            for id_, desc, monto, tipo in zip(
+                ids, cambios["Descripción"], cambios["Monto"], cambios["Tipo"]
+            )
+        ],
+    )
+    db.execute(
+        update(_metricas).where(_metricas.c.movimiento_id == bindparam("b_movimiento_id")),
+        [
+            {"b_movimiento_id": id_, "nivel": int(nivel)}
+            for id_, nivel in zip(ids, cambios["Satisfacción"])
+        ],
+    )
+
+
+def eliminar_movimientos(db, ids):
+    """Borra movimientos y sus métricas, y resta su aporte al resumen y al
+    detector de recurrentes. No hace commit."""
+    ids = [int(i) for i in ids]
+    claves = claves_de(db, ids)
+    with ajustar_resumen(db, ids):
+        db.execute(delete(_metricas).where(_metricas.c.movimiento_id.in_(ids)))
+        db.execute(delete(_movimientos).where(_movimientos.c.id.in_(ids)))
+    recalcular_claves(db, claves)
+    return len(ids)
@@ -0,0 +1,220 @@
+"""Importador de extractos bancarios (CSV / OFX) con memoria constante.
+
+Todo el flujo es una cadena de generadores: leer -> convertir -> lotes ->
+descartar duplicados -> insertar. Solo se mantiene en memoria un lote a la vez,
+sin importar el tamaño del archivo.
+"""
+import csv
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+from pydantic import ValidationError
+from sqlalchemy import select, tuple_
+from app.db.ingesta import TAMANO_LOTE, en_lotes, procesar_lote
+from app.models.movimiento import Movimiento
+from app.models.schemas import MovimientoEntrada
+
+# campo de MovimientoEntrada -> columna del CSV (None = no viene en el archivo)
+MAPEO_POR_DEFECTO = {
+    "fecha": "fecha",
+    "descripcion": "descripcion",
+    "monto": "monto",
+    "tipo": None,
+    "categoria": None,
+    "comentario": None,
+    "nivel_satisfaccion": None,
+}
+FORMATOS_FECHA = ("%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%d/%m/%Y", "%d-%m-%Y", "%Y%m%d", "%Y%m%d%H%M%S")
+# Los extractos no traen satisfacción; se usa un nivel neutro salvo que haya columna
+NIVEL_POR_DEFECTO = 5
+MAX_ERRORES_GUARDADOS = 100
+# Tuplas por consulta de duplicados (3 parámetros cada una; SQLite admite ~32k)
+BUSQUEDA_DUPLICADOS = 1000
+
+_ETIQUETA_OFX = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+
+
+def leer_csv(ruta, mapeo=None, delimitador=",", encoding="utf-8-sig"):
+    """Produce un dict por fila con los campos de MovimientoEntrada según `mapeo`."""
+    mapeo = {**MAPEO_POR_DEFECTO, **(mapeo or {})}
+    with open(ruta, newline="", encoding=encoding) as archivo:
+        for fila in csv.DictReader(archivo, delimiter=delimitador):
+            yield {campo: fila.get(columna) for campo, columna in mapeo.items() if columna}
+
+
+def leer_ofx(ruta, encoding="latin-1", tamano_bloque=64 * 1024):
+    """Produce un dict por transacción <STMTTRN> de un OFX (SGML o XML).
+
+    El archivo se lee por bloques, así que funciona aunque venga en una sola línea.
+    """
+    actual = None
+    pendiente = ""
+    with open(ruta, encoding=encoding) as archivo:
+        while True:
+            bloque = archivo.read(tamano_bloque)
+            pendiente += bloque
+            # Procesamos hasta la última etiqueta completa; el resto espera al siguiente bloque
+            corte = max(pendiente.rfind("<"), 0) if bloque else len(pendiente)
+            for cierre, etiqueta, valor in _ETIQUETA_OFX.findall(pendiente[:corte]):
+                etiqueta = etiqueta.upper()
+                if etiqueta == "STMTTRN":
+                    if cierre and actual is not None:
+                        yield _fila_ofx(actual)
+                        actual = None
+                    elif not cierre:
+                        actual = {}
+                elif actual is not None and not cierre and valor.strip():
+                    actual[etiqueta] = valor.strip()
+            pendiente = pendiente[corte:]
+            if not bloque:
+                break
+
+
+def _fila_ofx(transaccion):
+    return {
+        "fecha": transaccion.get("DTPOSTED", "")[:14],
+        "descripcion": transaccion.get("NAME") or transaccion.get("MEMO"),
+        "monto": transaccion.get("TRNAMT"),
+        "comentario": transaccion.get("MEMO") if transaccion.get("NAME") else None,
+    }
+
+
+def _fecha(texto):
+    texto = texto.strip()
+    for formato in FORMATOS_FECHA:
+        try:
+            return datetime.strptime(texto, formato)
+        except ValueError:
+            continue
+    raise ValueError(f"Fecha no reconocida: {texto!r}")
+
+
+def _monto(texto, separador_decimal="."):
+    texto = str(texto).strip().replace(" ", "").replace("$", "")
+    if separador_decimal == ",":
+        texto = texto.replace(".", "").replace(",", ".")
+    else:
+        texto = texto.replace(",", "")
+    return float(texto)
+
+
+def convertir(fila, separador_decimal=".", nivel_por_defecto=NIVEL_POR_DEFECTO):
+    """Convierte una fila cruda en MovimientoEntrada.
+
+    Sin columna de tipo, el signo decide: negativo = GASTO, positivo = INGRESO.
+    """
+    monto = _monto(fila["monto"], separador_decimal)
+    tipo = (fila.get("tipo") or "").strip().upper() or ("GASTO" if monto < 0 else "INGRESO")
+    return MovimientoEntrada(
+        tipo=tipo,
+        descripcion=(fila.get("descripcion") or "").strip(),
+        monto=abs(monto),
+        nivel_satisfaccion=int(fila.get("nivel_satisfaccion") or nivel_por_defecto),
+        categoria=(fila.get("categoria") or "").strip() or None,
+        comentario=(fila.get("comentario") or "").strip() or None,
+        fecha=_fecha(fila["fecha"]),
+    )
+
+
+def clave_duplicado(fecha, monto, descripcion):
+    """Hash de (fecha, monto, descripcion) con el que se detectan movimientos repetidos."""
+    texto = f"{fecha.isoformat()}|{round(float(monto), 2):.2f}|{descripcion.strip()}"
+    return hashlib.sha1(texto.encode()).hexdigest()
+
+
+def descartar_duplicados(db, lote):
+    """Quita del lote lo que ya está en la base (o repetido dentro del propio lote).
+
+    Solo se buscan las tuplas (fecha, monto, descripcion) del lote, así que el
+    costo y lo que devuelve la base dependen del lote y no del historial.
+    """
+    existentes = set()
+    for grupo in en_lotes(lote, BUSQUEDA_DUPLICADOS):
+        existentes.update(
+            clave_duplicado(*fila)
+            for fila in db.execute(
+                select(Movimiento.fecha, Movimiento.monto, Movimiento.descripcion).where(
+                    tuple_(Movimiento.fecha, Movimiento.monto, Movimiento.descripcion).in_(
+                        [(m.fecha, m.monto, m.descripcion) for m in grupo]
+                    )
+                )
+            )
+        )
+    nuevos = []
+    for m in lote:
+        clave = clave_duplicado(m.fecha, m.monto, m.descripcion)
+        if clave not in existentes:
+            existentes.add(clave)
+            nuevos.append(m)
+    return nuevos
+
+
+def _leer_checkpoint(ruta):
+    if ruta and os.path.exists(ruta):
+        with open(ruta, encoding="utf-8") as archivo:
+            return json.load(archivo)
+    return {"filas_confirmadas": 0, "insertados": 0, "duplicados": 0, "invalidos": 0}
+
+
+def _guardar_checkpoint(ruta, estado):
+    # Escritura atómica: un corte a mitad de escritura no deja el checkpoint corrupto
+    temporal = f"{ruta}.tmp"
+    with open(temporal, "w", encoding="utf-8") as archivo:
+        json.dump(estado, archivo)
+    os.replace(temporal, ruta)
+
+
+def importar(db, ruta, formato=None, mapeo=None, tamano_lote=TAMANO_LOTE, checkpoint=None,
+             separador_decimal=".", delimitador=",", nivel_por_defecto=NIVEL_POR_DEFECTO, al_confirmar=None):
+    """Importa un extracto CSV u OFX en lotes de tamaño fijo, un commit por lote.
+
+    Con `checkpoint` (ruta a un JSON) se guarda el avance tras cada lote
+    confirmado; si el proceso se corta, la siguiente ejecución retoma desde ahí.
+    `al_confirmar(estado)` se llama después de cada lote (p. ej. para mostrar progreso).
+    """
+    formato = (formato or os.path.splitext(ruta)[1].lstrip(".")).lower()
+    if formato == "csv":
+        filas = leer_csv(ruta, mapeo, delimitador)
+    elif formato in ("ofx", "qfx"):
+        filas = leer_ofx(ruta)
+    else:
+        raise ValueError(f"Formato no soportado: {formato}")
+
+    estado = _leer_checkpoint(checkpoint)
+    estado["errores"] = []
+    ya_confirmadas = estado["filas_confirmadas"]
+
+    def validas():
+        for numero, fila in enumerate(filas, start=1):
+            if numero <= ya_confirmadas:
+                continue
+            estado["filas_leidas"] = numero
+            try:
+                yield convertir(fila, separador_decimal, nivel_por_defecto)
+            except (ValidationError, ValueError, KeyError, TypeError) as e:
+                estado["invalidos"] += 1
+                if len(estado["errores"]) < MAX_ERRORES_GUARDADOS:
+                    estado["errores"].append({"fila": numero, "error": str(e)})
+
+    for lote in en_lotes(validas(), tamano_lote):
+        nuevos = descartar_duplicados(db, lote)
+        estado["duplicados"] += len(lote) - len(nuevos)
+        if nuevos:
+            resultado = procesar_lote(db, nuevos)
+            if resultado.get("error"):
+                # El checkpoint queda en el último lote confirmado; se puede reintentar
+                raise RuntimeError(f"Falló el lote que termina en la fila {estado['filas_leidas']}: {resultado['error']}")
+            estado["insertados"] += resultado["insertados"]
+        estado["filas_confirmadas"] = estado["filas_leidas"]
+        if checkpoint:
+            _guardar_checkpoint(checkpoint, {k: v for k, v in estado.items() if k != "errores"})
+        if al_confirmar:
+            al_confirmar(estado)
+
+    # Importación completa: el checkpoint ya no hace falta
+    estado["filas_confirmadas"] = estado.get("filas_leidas", ya_confirmadas)
+    if checkpoint and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return estado
@@ -0,0 +1,135 @@
+from datetime import datetime
+from itertools import islice
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from app.db.categorias import ids_por_nombre, invalidar_categorias
+from app.db.ledger import registrar_escritura
+from app.db.recurrencias import actualizar_recurrencias
+from app.db.resumen import sumar_filas
+from app.models.movimiento import Categoria, Movimiento
+from app.models.satisfaccion import MetricaSatisfaccion
+
+TAMANO_LOTE = 1000
+TAMANO_LOTE_MAXIMO = 10_000
+
+_movimientos = Movimiento.__table__
+_metricas = MetricaSatisfaccion.__table__
+_categorias = Categoria.__table__
+# Marca en `Session.info`: la transacción creó categorías
+_CATEGORIAS_CREADAS = "ingesta.categorias_creadas"
+
+
+def en_lotes(iterable, tamano=TAMANO_LOTE):
+    """Agrupa cualquier iterable en listas de `tamano` elementos sin materializarlo."""
+    iterador = iter(iterable)
+    while lote := list(islice(iterador, tamano)):
+        yield lote
+
+
+def resolver_categorias(db, tipos_por_nombre):
+    """Mapa nombre -> id; crea las categorías que aún no existen.
+
+    Los nombres se normalizan igual que en la pantalla de Categorías (strip + title).
+    Las ya conocidas salen de la caché de categorías (no se borran ni renombran),
+    así que un alta con categoría existente no agrega consultas.
+    """
+    tipos_por_nombre = {nombre.strip().title(): tipo for nombre, tipo in tipos_por_nombre.items()}
+    if not tipos_por_nombre:
+        return {}
+    conocidas = ids_por_nombre(db)
+    ids = {n: conocidas[n] for n in tipos_por_nombre if n in conocidas}
+    pendientes = [n for n in tipos_por_nombre if n not in ids]
+    if pendientes:
+        ids.update(db.execute(
+            select(_categorias.c.nombre, _categorias.c.id).where(_categorias.c.nombre.in_(pendientes))
+        ).all())
+    faltantes = [{"nombre": n, "tipo": t} for n, t in tipos_por_nombre.items() if n not in ids]
+    if faltantes:
+        creadas = db.execute(
+            insert(_categorias).returning(_categorias.c.nombre, _categorias.c.id, sort_by_parameter_order=True),
+            faltantes,
+        ).all()
+        ids.update(dict(creadas))
+        db.info[_CATEGORIAS_CREADAS] = True # La caché se invalida recién tras el commit
+    return ids
+
+
+def insertar_lote(db, movimientos):
+    """Inserta movimientos y métricas con un INSERT masivo por tabla. Devuelve los ids.
+
+    `movimientos` son `MovimientoEntrada` ya validados. No hace commit.
+    """
+    categorias = resolver_categorias(db, {m.categoria: m.tipo for m in movimientos if m.categoria})
+    ahora = datetime.utcnow()
+    filas = [
+        {
+            "tipo": m.tipo,
+            "descripcion": m.descripcion,
+            "monto": m.monto,
+            "fecha": m.fecha or ahora,
+            "categoria_id": categorias.get(m.categoria.strip().title()) if m.categoria else None,
+        }
+        for m in movimientos
+    ]
+    ids = db.execute(
+        insert(_movimientos).returning(_movimientos.c.id, sort_by_parameter_order=True), filas
+    ).scalars().all()
+    db.execute(
+        insert(_metricas),
+        [
+            {"movimiento_id": id_, "nivel": m.nivel_satisfaccion, "comentario": m.comentario}
+            for id_, m in zip(ids, movimientos)
+        ],
+    )
+    # Los valores ya están en memoria: el resumen se actualiza sin releer el lote
+    sumar_filas(db, [
+        (f["fecha"], f["categoria_id"], f["tipo"], f["monto"], m.nivel_satisfaccion)
+        for f, m in zip(filas, movimientos)
+    ])
+    return ids
+
+
+def registrar_movimiento(db, movimiento):
+    """Alta de un movimiento con su métrica (API y formulario de Streamlit).
+
+    Mismo camino que los lotes: un INSERT ... RETURNING por tabla y el resumen
+    sumado sin releer. Devuelve el id. No hace commit; después del commit hay
+    que llamar a `despues_de_confirmar(db)`.
+    """
+    return insertar_lote(db, [movimiento])[0]
+
+
+def despues_de_confirmar(db):
+    """Tras confirmar altas: pasa los gastos nuevos al detector de recurrencias
+    (en su propia transacción) y avisa la versión del ledger y, si se crearon,
+    categorías.
+    """
+    try:
+        actualizar_recurrencias(db)
+        db.commit()
+    except SQLAlchemyError:
+        db.rollback() # Las altas ya están confirmadas: la próxima corrida toma sus gastos
+    registrar_escritura()
+    if db.info.pop(_CATEGORIAS_CREADAS, False):
+        invalidar_categorias()
+
+
+def procesar_lote(db, movimientos, numero=0):
+    """Inserta un lote en su propia transacción y devuelve el resultado del lote."""
+    try:
+        ids = insertar_lote(db, movimientos)
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        return {"lote": numero, "insertados": 0, "ids": [], "error": str(e.__cause__ or e)}
+    despues_de_confirmar(db)
+    return {"lote": numero, "insertados": len(ids), "ids": ids}
+
+
+def ingerir(db, movimientos, tamano_lote=TAMANO_LOTE):
+    """Inserta un iterable de movimientos en lotes, con un commit por lote.
+
+    Es un generador: produce el resultado de cada lote a medida que se confirma.
+    """
+    for numero, lote in enumerate(en_lotes(movimientos, tamano_lote)):
+        yield procesar_lote(db, lote, numero)
@@ -0,0 +1,274 @@
+"""Copia local del ledger en Parquet, particionada por mes.
+
+    python exportar_instantanea.py [--dir instantanea] [--completo]
+
+Estructura del directorio:
+
+    movimientos/mes=AAAA-MM/parte-<primer id>-<último id>.parquet
+    categorias.parquet, metas_ahorro.parquet
+    estado.json (marca de id y huella de cada mes)
+
+Cada movimiento lleva su métrica (nivel, comentario) y el id de su categoría;
+el nombre de la categoría se toma de categorias.parquet al leer. Cada
+sincronización:
+
+1. agrega solo los movimientos con id mayor a la marca,
+2. compara la huella de cada mes (cantidad, suma de montos y de niveles por
+   tipo) del resumen mensual con la que tenía en la sincronización anterior
+   más los movimientos agregados, y reescribe solo los meses que cambiaron de
+   otra forma, es decir, los que tuvieron ediciones o borrados. Se guarda la
+   huella del resumen, no la de la copia: un mes cuyo resumen no cuadra con
+   sus movimientos se reescribe una vez y no en cada sincronización,
+3. reescribe categorías y metas (tablas chicas).
+
+Una edición que solo cambia la descripción no altera la huella: `--completo`
+rehace la copia desde cero.
+
+Los análisis leen la copia con `leer_movimientos` (archivos memory-mapped,
+solo las columnas y los meses pedidos); `MotorIA.desde_instantanea` y
+`MotorPsicometricoInstantanea` la usan en lugar de la base remota.
+"""
+import json
+import os
+import shutil
+from collections import defaultdict
+from datetime import datetime
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow import fs
+from sqlalchemy import func, select
+from app.db.cargador import COLUMNAS, TAMANO_BLOQUE, TIPOS, iterar_movimientos, marco_movimientos
+from app.db.resumen import MES_SIN_FECHA
+from app.models.meta import MetaAhorro
+from app.models.movimiento import Categoria, Movimiento
+from app.models.resumen import ResumenMensual
+
+DIRECTORIO = os.getenv("INSTANTANEA_DIR") or "instantanea"
+
+ESQUEMA_MOVIMIENTOS = pa.schema([
+    ("id", pa.int64()),
+    ("fecha", pa.timestamp("us")),
+    ("tipo", pa.string()),
+    ("descripcion", pa.string()),
+    ("clave", pa.string()),
+    ("monto", pa.float64()),
+    ("categoria_id", pa.int32()),
+    ("nivel", pa.int8()),
+    ("comentario", pa.string()),
+])
+COLUMNAS_ARCHIVO = tuple(ESQUEMA_MOVIMIENTOS.names)
+_MES_SIN_FECHA = f"{MES_SIN_FECHA:%Y-%m}"
+# Diferencia de montos por redondeo que no cuenta como cambio
+_TOLERANCIA = 0.005
+
+
+# --- Estado y archivos ---
+
+def _ruta(directorio, *partes):
+    return os.path.join(directorio, *partes)
+
+
+def _leer_estado(directorio):
+    try:
+        with open(_ruta(directorio, "estado.json"), encoding="utf-8") as archivo:
+            return json.load(archivo)
+    except FileNotFoundError:
+        return None
+
+
+def _guardar_estado(directorio, estado):
+    temporal = _ruta(directorio, "_estado.json")
+    with open(temporal, "w", encoding="utf-8") as archivo:
+        json.dump(estado, archivo)
+    os.replace(temporal, _ruta(directorio, "estado.json"))
+
+
+def _escribir(tabla, ruta):
+    """Escribe y renombra: un lector nunca ve un archivo a medio escribir."""
+    carpeta, nombre = os.path.split(ruta)
+    temporal = os.path.join(carpeta, "_" + nombre) # los lectores ignoran el prefijo "_"
+    pq.write_table(tabla, temporal, compression="zstd")
+    os.replace(temporal, ruta)
+
+
+def _meses(movimientos):
+    return movimientos["fecha"].dt.strftime("%Y-%m").fillna(_MES_SIN_FECHA)
+
+
+def _escribir_mes(directorio, mes, movimientos, reemplazar=False):
+    """Guarda los movimientos de un mes como una parte nueva (o como única parte)."""
+    carpeta = _ruta(directorio, "movimientos", f"mes={mes}")
+    if movimientos.empty:
+        shutil.rmtree(carpeta, ignore_errors=True)
+        return
+    os.makedirs(carpeta, exist_ok=True)
+    nombre = f"parte-{movimientos['id'].min():010d}-{movimientos['id'].max():010d}.parquet"
+    tabla = pa.Table.from_pandas(
+        movimientos[list(COLUMNAS_ARCHIVO)].astype({"tipo": object}),
+        schema=ESQUEMA_MOVIMIENTOS, preserve_index=False,
+    )
+    _escribir(tabla, os.path.join(carpeta, nombre))
+    if reemplazar:
+        for otro in os.listdir(carpeta):
+            if otro != nombre:
+                os.remove(os.path.join(carpeta, otro))
+
+
+def _escribir_tabla(directorio, nombre, resultado):
+    columnas = list(resultado.keys())
+    filas = resultado.all()
+    tabla = pa.table({c: [f[i] for f in filas] for i, c in enumerate(columnas)})
+    _escribir(tabla, _ruta(directorio, f"{nombre}.parquet"))
+
+
+# --- Huellas por (mes, tipo): [cantidad, suma de montos, suma de niveles] ---
+
+def _sumar_huellas(huellas, movimientos):
+    grupos = (
+        movimientos.assign(mes=_meses(movimientos), nivel=movimientos["nivel"].fillna(0))
+        .groupby(["mes", "tipo"], observed=True)
+        .agg(cantidad=("id", "size"), suma=("monto", "sum"), suma_nivel=("nivel", "sum"))
+    )
+    for (mes, tipo), fila in grupos.iterrows():
+        huella = huellas[f"{mes}|{tipo}"]
+        huella[0] += int(fila.cantidad)
+        huella[1] += float(fila.suma)
+        huella[2] += int(fila.suma_nivel)
+
+
+def _huellas_resumen(db):
+    """Las mismas huellas, leídas del resumen mensual (meses x tipos filas)."""
+    filas = db.execute(
+        select(
+            ResumenMensual.mes, ResumenMensual.tipo, func.sum(ResumenMensual.cantidad),
+            func.sum(ResumenMensual.suma), func.sum(ResumenMensual.suma_nivel),
+        ).group_by(ResumenMensual.mes, ResumenMensual.tipo)
+    )
+    return {f"{mes:%Y-%m}|{tipo}": [int(c), float(s), int(n)] for mes, tipo, c, s, n in filas}
+
+
+def _coincide(a, b):
+    if a is None or b is None:
+        return a == b
+    return a[0] == b[0] and a[2] == b[2] and abs(a[1] - b[1]) <= _TOLERANCIA
+
+
+def _condiciones_mes(mes):
+    if mes == _MES_SIN_FECHA:
+        return (Movimiento.fecha.is_(None),)
+    anio, numero = map(int, mes.split("-"))
+    inicio = datetime(anio, numero, 1)
+    fin = datetime(anio + numero // 12, numero % 12 + 1, 1)
+    return (Movimiento.fecha >= inicio, Movimiento.fecha < fin)
+
+
+# --- Sincronización ---
+
+def sincronizar_instantanea(db, directorio=DIRECTORIO, completo=False, tamano_bloque=TAMANO_BLOQUE):
+    """Actualiza la copia local desde la base y devuelve qué cambió.
+
+    Solo lee de la base: movimientos nuevos por id, el resumen mensual, y los
+    meses cuya huella cambió más allá de los movimientos nuevos.
+    """
+    os.makedirs(directorio, exist_ok=True)
+    estado = None if completo else _leer_estado(directorio)
+    if estado is None:
+        shutil.rmtree(_ruta(directorio, "movimientos"), ignore_errors=True)
+        estado = {"ultimo_id": 0, "huellas": {}}
+    desde_id = estado["ultimo_id"]
+    huellas = defaultdict(lambda: [0, 0.0, 0], estado["huellas"])
+    hasta_id = db.execute(select(func.max(Movimiento.id))).scalar() or 0
+
+    nuevos = 0
+    if hasta_id > desde_id:
+        for bloque in iterar_movimientos(db, COLUMNAS_ARCHIVO, tamano_bloque,
+                                         condiciones=(Movimiento.id > desde_id, Movimiento.id <= hasta_id)):
+            nuevos += len(bloque)
+            for mes, parte in bloque.groupby(_meses(bloque), sort=False):
+                _escribir_mes(directorio, mes, parte)
+            _sumar_huellas(huellas, bloque)
+
+    # Meses cuyo resumen cambió más que lo agregado: hubo ediciones o borrados
+    en_base = _huellas_resumen(db)
+    meses = sorted({
+        clave.split("|")[0] for clave in set(en_base) | set(huellas)
+        if not _coincide(en_base.get(clave), huellas.get(clave))
+    })
+    for mes in meses:
+        # El marco vacío cubre el mes que quedó sin movimientos: se borra su partición
+        movimientos = pd.concat(
+            [marco_movimientos([], COLUMNAS_ARCHIVO),
+             *iterar_movimientos(db, COLUMNAS_ARCHIVO, tamano_bloque,
+                                 condiciones=(*_condiciones_mes(mes), Movimiento.id <= hasta_id))],
+            ignore_index=True,
+        )
+        _escribir_mes(directorio, mes, movimientos, reemplazar=True)
+
+    _escribir_tabla(directorio, "categorias", db.execute(select(Categoria.id, Categoria.nombre, Categoria.tipo)))
+    _escribir_tabla(directorio, "metas_ahorro", db.execute(
+        select(MetaAhorro.id, MetaAhorro.nombre, MetaAhorro.monto_objetivo, MetaAhorro.monto_actual,
+               MetaAhorro.fecha_creacion)
+    ))
+    _guardar_estado(directorio, {
+        "ultimo_id": max(desde_id, hasta_id),
+        "huellas": en_base,
+        "sincronizado": datetime.utcnow().isoformat(timespec="seconds"),
+    })
+    return {"nuevos": nuevos, "meses_reescritos": meses, "ultimo_id": max(desde_id, hasta_id)}
+
+
+# --- Lectura ---
+
+def _dataset(directorio):
+    # use_mmap: los archivos se mapean en memoria en lugar de copiarse
+    return ds.dataset(
+        os.path.abspath(_ruta(directorio, "movimientos")),
+        format="parquet",
+        partitioning=ds.partitioning(pa.schema([("mes", pa.string())]), flavor="hive"),
+        filesystem=fs.LocalFileSystem(use_mmap=True),
+    )
+
+
+def leer_tabla(directorio, nombre):
+    """categorias o metas_ahorro como DataFrame."""
+    return pq.read_table(_ruta(directorio, f"{nombre}.parquet"), memory_map=True).to_pandas()
+
+
+def leer_movimientos(directorio=DIRECTORIO, columnas=COLUMNAS, tipo=None, desde=None, hasta=None):
+    """Movimientos de la copia local con las columnas y dtypes de `app.db.cargador`.
+
+    Solo se abren las particiones (meses) del rango pedido.
+    """
+    columnas = tuple(columnas)
+    nombres = None
+    if "categoria" in columnas:
+        categorias = leer_tabla(directorio, "categorias")
+        nombres = dict(zip(categorias["id"], categorias["nombre"]))
+    if not os.path.isdir(_ruta(directorio, "movimientos")):
+        return marco_movimientos([], columnas, sorted(nombres.values()) if nombres is not None else None)
+
+    filtro = ds.scalar(True)
+    if tipo:
+        filtro &= ds.field("tipo") == tipo
+    if desde is not None:
+        filtro &= (ds.field("mes") >= f"{desde:%Y-%m}") & (ds.field("fecha") >= pd.Timestamp(desde))
+    if hasta is not None:
+        filtro &= (ds.field("mes") <= f"{hasta:%Y-%m}") & (ds.field("fecha") < pd.Timestamp(hasta))
+    leidas = {"id", *(c for c in columnas if c != "categoria")}
+    if nombres is not None:
+        leidas.add("categoria_id")
+    tabla = _dataset(directorio).to_table(columns=sorted(leidas), filter=filtro)
+    movimientos = tabla.to_pandas(
+        types_mapper={pa.int8(): pd.Int8Dtype(), pa.int32(): pd.Int32Dtype()}.get
+    ).sort_values("id", ignore_index=True)
+
+    if "tipo" in movimientos:
+        movimientos["tipo"] = movimientos["tipo"].astype(pd.CategoricalDtype(TIPOS))
+    if nombres is not None:
+        movimientos["categoria"] = (
+            movimientos["categoria_id"].map(nombres).astype(pd.CategoricalDtype(sorted(nombres.values())))
+        )
+    return movimientos[list(columnas)]
+
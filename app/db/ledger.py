@@ -0,0 +1,40 @@
+import threading
+from sqlalchemy import func
+from app.db import cache
+from app.db.queries import monto_maximo, pagina_recientes, totales_por_tipo
+from app.models.movimiento import Movimiento
+
+# Contador de escrituras del proceso. Lo incrementan las rutas que hacen commit
+# (registrar, editar, borrar) para que las cachés sepan que el ledger cambió.
+_escrituras = 0
+_lock = threading.Lock()
+
+
+def registrar_escritura():
+    """Marca que se confirmó una escritura de movimientos y vacía las cachés de análisis."""
+    global _escrituras
+    with _lock:
+        _escrituras += 1
+    cache.invalidar(*cache.ANALISIS)
+
+
+def version_ledger(db):
+    """Sello de versión del ledger: (id máximo, escrituras del proceso).
+
+    El id máximo detecta altas hechas desde otros procesos (p. ej. la API) y
+    cuesta una sola búsqueda por índice; el contador cubre ediciones y borrados.
+    """
+    max_id = db.query(func.max(Movimiento.id)).scalar() or 0
+    return (max_id, _escrituras)
+
+
+def cargar_ledger(db, limite_recientes=5):
+    """Totales, monto máximo y primera página de actividad, calculados en la base."""
+    recientes, siguiente = pagina_recientes(db, limite_recientes)
+    return {
+        **totales_por_tipo(db),
+        "valor_maximo": monto_maximo(db),
+        "recientes": recientes,
+        "siguiente": siguiente,
+    }
+
@@ -0,0 +1,131 @@
+"""Sincronización del esquema e índices sobre una base ya existente.
+
+`create_all` solo crea tablas que faltan: no agrega columnas ni índices nuevos
+a tablas que ya existen. Este módulo cubre ese hueco. Uso:
+
+    python -m app.db.migraciones
+"""
+from sqlalchemy import bindparam, func, inspect, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateColumn
+from app.db.resumen import reconstruir_resumen
+from app.db.session import Base
+from app.ia.normalizacion import normalizar_descripcion
+# Importamos los modelos para que Base "sepa" que existen
+from app.models.meta import MetaAhorro  # noqa: F401
+from app.models.movimiento import Movimiento
+from app.models.recurrencia import MarcaProceso, Recurrencia  # noqa: F401
+from app.models.resumen import ResumenMensual
+from app.models.satisfaccion import MetricaSatisfaccion
+
+
+def metricas_duplicadas(conn):
+    """Cantidad de movimientos con más de una métrica (impiden el índice único)."""
+    repetidos = (
+        select(MetricaSatisfaccion.movimiento_id)
+        .group_by(MetricaSatisfaccion.movimiento_id)
+        .having(func.count() > 1)
+        .subquery()
+    )
+    return conn.execute(select(func.count()).select_from(repetidos)).scalar()
+
+
+TAMANO_RELLENO = 5000
+
+
+def agregar_columnas(engine):
+    """Agrega (como NULL) las columnas declaradas en los modelos que falten en la base.
+
+    Devuelve la lista "tabla.columna" de las columnas agregadas.
+    """
+    agregadas = []
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for tabla in Base.metadata.sorted_tables:
+            if not inspector.has_table(tabla.name):
+                continue
+            existentes = {c["name"] for c in inspector.get_columns(tabla.name)}
+            for columna in tabla.columns:
+                if columna.name in existentes:
+                    continue
+                definicion = CreateColumn(columna).compile(dialect=conn.dialect)
+                palabra = "" if conn.dialect.name == "mssql" else "COLUMN "
+                conn.exec_driver_sql(f"ALTER TABLE {tabla.name} ADD {palabra}{definicion}")
+                agregadas.append(f"{tabla.name}.{columna.name}")
+    return agregadas
+
+
+def rellenar_claves(engine):
+    """Calcula `clave_descripcion` de los movimientos que no la tienen, por tandas
+    recorridas por id (cada tanda es una búsqueda por rango en la clave primaria).
+    """
+    movimientos = Movimiento.__table__
+    total, cursor = 0, 0
+    while True:
+        with engine.begin() as conn:
+            filas = conn.execute(
+                select(movimientos.c.id, movimientos.c.descripcion)
+                .where(movimientos.c.id > cursor, movimientos.c.clave_descripcion.is_(None))
+                .order_by(movimientos.c.id)
+                .limit(TAMANO_RELLENO)
+            ).all()
+            if not filas:
+                return total
+            cursor = filas[-1].id
+            conn.execute(
+                update(movimientos).where(movimientos.c.id == bindparam("b_id")),
+                [{"b_id": id_, "clave_descripcion": normalizar_descripcion(d)} for id_, d in filas],
+            )
+        total += len(filas)
+
+
+def crear_indices(engine):
+    """Crea los índices declarados en los modelos que aún no existan.
+
+    Devuelve (creados, omitidos): nombres de los índices creados y pares
+    (nombre, motivo) de los omitidos. Si hay métricas duplicadas por movimiento,
+    el índice único se omite en vez de fallar.
+    """
+    creados, omitidos = [], []
+    with engine.begin() as conn:
+        duplicadas = metricas_duplicadas(conn)
+        for tabla in Base.metadata.sorted_tables:
+            for indice in sorted(tabla.indexes, key=lambda i: i.name):
+                if indice.unique and tabla.name == MetricaSatisfaccion.__tablename__ and duplicadas:
+                    omitidos.append((indice.name, f"{duplicadas} movimiento(s) con métricas duplicadas"))
+                    continue
+                if not conn.dialect.has_index(conn, tabla.name, indice.name):
+                    indice.create(conn)
+                    creados.append(indice.name)
+    return creados, omitidos
+
+
+def sincronizar_esquema(engine):
+    """Crea las tablas y columnas que falten y después los índices que falten.
+
+    Rellena la clave de descripción de los movimientos existentes y, si la tabla
+    del resumen mensual es nueva, la llena para que los totales no arranquen en cero.
+    Devuelve lo mismo que `crear_indices`.
+    """
+    resumen_nuevo = not inspect(engine).has_table(ResumenMensual.__tablename__)
+    Base.metadata.create_all(bind=engine)
+    agregar_columnas(engine)
+    rellenar_claves(engine)
+    indices = crear_indices(engine)
+    if resumen_nuevo:
+        with Session(engine) as db:
+            reconstruir_resumen(db)
+            db.commit()
+    return indices
+
+
+if __name__ == "__main__":
+    from app.db.session import obtener_engine
+
+    print("--- Sincronizando esquema e índices ---")
+    creados, omitidos = sincronizar_esquema(obtener_engine())
+    for nombre in creados:
+        print(f"✅ Índice creado: {nombre}")
+    for nombre, motivo in omitidos:
+        print(f"⚠️ {nombre} omitido: {motivo}.")
+    print("Listo.")
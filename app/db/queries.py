@@ -1,10 +1,102 @@
-from app.db.session import Session
-from app.models.movimiento import Movimiento
+from collections import namedtuple
+from sqlalchemy import func
+from app.db.historial import pagina_historial
+from app.db.session import SessionLocal
+from app.models.movimiento import SIN_CATEGORIA, Categoria, Movimiento
+from app.models.resumen import ResumenMensual
+
+# Fila ligera (columnas, no objeto ORM) que se puede guardar en caché y serializar
+MovimientoResumen = namedtuple(
+    "MovimientoResumen", ["id", "tipo", "descripcion", "monto", "fecha", "clave"], defaults=[None]
+)
+
+OTROS = "Otros"
+TOP_PORCIONES = 8
+TOP_PORCIONES_MAXIMO = 50
 
 def listar_movimientos():
-    session = Session()
+    session = SessionLocal()
     try:
         movimientos = session.query(Movimiento).all()
         return movimientos
     finally:
         session.close()
+
+def totales_por_tipo(db):
+    """Suma de montos por tipo, leída del resumen mensual (meses x categorías filas)."""
+    totales = dict(
+        db.query(ResumenMensual.tipo, func.sum(ResumenMensual.suma))
+        .group_by(ResumenMensual.tipo)
+        .all()
+    )
+    total_ingresos = totales.get("INGRESO") or 0
+    total_gastos = totales.get("GASTO") or 0
+    return {
+        "total_ingresos": total_ingresos,
+        "total_gastos": total_gastos,
+        "saldo_final": total_ingresos - total_gastos,
+    }
+
+def monto_maximo(db):
+    """Monto más alto del ledger (1 si está vacío, para usarlo como divisor)."""
+    return db.query(func.max(Movimiento.monto)).scalar() or 1
+
+def pagina_recientes(db, limite=5, cursor=None):
+    """Página de movimientos recientes: el historial por fecha descendente.
+
+    `cursor` es el (fecha, id) de la última fila de la página anterior. Devuelve
+    (filas, siguiente_cursor); el cursor es None cuando no quedan más filas.
+    """
+    filas, siguiente = pagina_historial(db, limite, cursor, orden="fecha", descendente=True)
+    return [MovimientoResumen(f.id, f.tipo, f.descripcion, f.monto, f.fecha) for f in filas], siguiente
+
+def top_por_tipo(db, tipo, agrupar="descripcion", limite=TOP_PORCIONES):
+    """Porciones de un gráfico de pastel: las `limite` mayores por monto y "Otros".
+
+    Con agrupar="descripcion" se agrupa por descripción normalizada; con
+    "categoria" se lee el resumen mensual. La base devuelve solo las primeras
+    filas junto con los totales del tipo (funciones de ventana), así que el
+    resultado tiene a lo sumo `limite` + 1 dicts {clave, etiqueta, monto, cantidad}.
+    """
+    if agrupar == "descripcion":
+        clave = Movimiento.clave_descripcion
+        etiqueta = func.min(Movimiento.descripcion)
+        monto = func.sum(Movimiento.monto)
+        cantidad = func.count()
+        consulta = db.query(clave, etiqueta, monto, cantidad).filter(Movimiento.tipo == tipo)
+    elif agrupar == "categoria":
+        clave = ResumenMensual.categoria_id
+        etiqueta = func.coalesce(func.min(Categoria.nombre), SIN_CATEGORIA)
+        monto = func.sum(ResumenMensual.suma)
+        cantidad = func.sum(ResumenMensual.cantidad)
+        consulta = (
+            db.query(clave, etiqueta, monto, cantidad)
+            .outerjoin(Categoria, Categoria.id == ResumenMensual.categoria_id)
+            .filter(ResumenMensual.tipo == tipo)
+        )
+    else:
+        raise ValueError(f"agrupar debe ser 'descripcion' o 'categoria', no {agrupar!r}")
+
+    filas = (
+        consulta.add_columns(func.sum(monto).over(), func.sum(cantidad).over())
+        .group_by(clave)
+        .order_by(monto.desc(), clave)
+        .limit(limite)
+        .all()
+    )
+    if not filas:
+        return []
+    porciones = [
+        {"clave": f[0], "etiqueta": (f[1] or "").strip(), "monto": f[2], "cantidad": f[3]}
+        for f in filas
+    ]
+    resto_monto = filas[0][4] - sum(p["monto"] for p in porciones)
+    resto_cantidad = filas[0][5] - sum(p["cantidad"] for p in porciones)
+    if resto_cantidad > 0:
+        porciones.append({"clave": OTROS, "etiqueta": OTROS, "monto": resto_monto, "cantidad": resto_cantidad})
+    return porciones
+
+def calcular_balance(db):
+    """(ingresos, gastos, balance) a partir de los totales por tipo."""
+    totales = totales_por_tipo(db)
+    return totales["total_ingresos"], totales["total_gastos"], totales["saldo_final"]
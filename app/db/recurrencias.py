@@ -0,0 +1,278 @@
+"""Detector incremental de cargos recurrentes (suscripciones).
+
+Cada corrida lee solo los gastos con id mayor a la marca guardada
+(`MarcaProceso`), los agrupa por `clave_descripcion` y suma su aporte al estado
+de cada clave (`Recurrencia`). Si un gasto nuevo es anterior al último cargo
+conocido de su clave (p. ej. un extracto viejo importado tarde), esa clave se
+recalcula desde sus movimientos usando el índice (clave_descripcion, fecha).
+Las ediciones y borrados del historial recalculan las claves afectadas.
+
+Un alta con id menor a la marca puede confirmarse después de la corrida (su
+transacción empezó antes y terminó después que otra). Los ids que faltaban
+bajo la marca se guardan como huecos; cada corrida revisa los de las últimas
+`VENTANA_HUECOS` y recalcula las claves de los que aparecieron. La ingesta
+corre el detector después de cada commit (`app.db.ingesta.despues_de_confirmar`).
+"""
+import json
+import math
+from datetime import datetime
+from itertools import groupby
+from sqlalchemy import delete, func, select, update
+from app.models.movimiento import Movimiento
+from app.models.recurrencia import MarcaProceso, Recurrencia
+from app.models.satisfaccion import MetricaSatisfaccion
+
+PROCESO = "recurrencias"
+SEGUNDOS_POR_DIA = 86400
+PERIODOS_DIAS = {"semanal": 7, "quincenal": 15, "mensual": 365.25 / 12, "trimestral": 365.25 / 4, "anual": 365.25}
+TAMANO_TANDA = 5000
+CLAVES_POR_CONSULTA = 500
+# Ids bajo la marca en los que todavía se espera un alta tardía; los huecos más
+# viejos se dan por descartados (transacciones deshechas)
+VENTANA_HUECOS = 100_000
+
+
+def _consulta_gastos():
+    return (
+        select(
+            Movimiento.id,
+            Movimiento.clave_descripcion,
+            Movimiento.descripcion,
+            Movimiento.fecha,
+            Movimiento.monto,
+            MetricaSatisfaccion.nivel,
+        )
+        .outerjoin(MetricaSatisfaccion, MetricaSatisfaccion.movimiento_id == Movimiento.id)
+        .where(Movimiento.tipo == "GASTO", Movimiento.fecha.isnot(None), Movimiento.clave_descripcion != "")
+    )
+
+
+def _nuevo_estado(clave, descripcion):
+    return Recurrencia(
+        clave=clave, descripcion=descripcion.strip(), ocurrencias=0, suma_monto=0.0, suma_monto2=0.0,
+        intervalos=0, suma_dias=0.0, suma_dias2=0.0, con_nivel=0, suma_nivel=0,
+    )
+
+
+def _sumar(estado, fila):
+    """Agrega un cargo (posterior o igual al último) a las sumas de su clave."""
+    if estado.ultima_fecha is not None:
+        dias = (fila.fecha - estado.ultima_fecha).total_seconds() / SEGUNDOS_POR_DIA
+        estado.intervalos += 1
+        estado.suma_dias += dias
+        estado.suma_dias2 += dias * dias
+    estado.ocurrencias += 1
+    estado.suma_monto += fila.monto
+    estado.suma_monto2 += fila.monto * fila.monto
+    if fila.nivel is not None:
+        estado.con_nivel += 1
+        estado.suma_nivel += fila.nivel
+    estado.ultima_fecha = fila.fecha
+    estado.ultimo_monto = fila.monto
+
+
+def _estados(db, claves):
+    estados = {}
+    claves = list(claves)
+    for i in range(0, len(claves), CLAVES_POR_CONSULTA):
+        consulta = select(Recurrencia).where(Recurrencia.clave.in_(claves[i:i + CLAVES_POR_CONSULTA]))
+        estados.update((r.clave, r) for r in db.execute(consulta).scalars())
+    return estados
+
+
+def _marca(db):
+    marca = db.get(MarcaProceso, PROCESO)
+    if marca is None:
+        marca = MarcaProceso(nombre=PROCESO, ultimo_id=0)
+        db.add(marca)
+        db.flush()
+    return marca
+
+
+def _ids_entre(db, desde, hasta):
+    return db.execute(
+        select(Movimiento.id)
+        .where(Movimiento.id >= desde, Movimiento.id <= hasta)
+        .order_by(Movimiento.id)
+        .execution_options(yield_per=TAMANO_TANDA)
+    ).scalars()
+
+
+def _huecos(ids, desde, hasta):
+    """Rangos [a, b] dentro de [desde, hasta] sin ninguno de los `ids` (ordenados)."""
+    huecos, esperado = [], desde
+    for id_ in ids:
+        if id_ > esperado:
+            huecos.append([esperado, id_ - 1])
+        esperado = id_ + 1
+    if esperado <= hasta:
+        huecos.append([esperado, hasta])
+    return huecos
+
+
+def claves_de(db, ids):
+    """Claves de descripción de los movimientos indicados."""
+    ids = [int(i) for i in ids]
+    claves = set()
+    for i in range(0, len(ids), CLAVES_POR_CONSULTA):
+        claves.update(db.execute(
+            select(Movimiento.clave_descripcion).where(Movimiento.id.in_(ids[i:i + CLAVES_POR_CONSULTA]))
+        ).scalars())
+    return claves - {None, ""}
+
+
+def recalcular_claves(db, claves, hasta_id=None):
+    """Rehace el estado de `claves` con sus movimientos hasta la marca. No hace commit."""
+    if hasta_id is None:
+        marca = db.get(MarcaProceso, PROCESO)
+        if marca is None:
+            return 0 # El detector todavía no corrió: la primera corrida las verá
+        hasta_id = marca.ultimo_id
+    claves = sorted(set(claves) - {None, ""})
+    for i in range(0, len(claves), CLAVES_POR_CONSULTA):
+        grupo = claves[i:i + CLAVES_POR_CONSULTA]
+        db.execute(delete(Recurrencia).where(Recurrencia.clave.in_(grupo)))
+        filas = db.execute(
+            _consulta_gastos()
+            .where(Movimiento.clave_descripcion.in_(grupo), Movimiento.id <= hasta_id)
+            .order_by(Movimiento.clave_descripcion, Movimiento.fecha, Movimiento.id)
+        ).all()
+        for clave, filas_clave in groupby(filas, key=lambda f: f.clave_descripcion):
+            filas_clave = list(filas_clave)
+            estado = _nuevo_estado(clave, filas_clave[0].descripcion)
+            for fila in filas_clave:
+                _sumar(estado, fila)
+            db.add(estado)
+    db.flush()
+    return len(claves)
+
+
+def actualizar_recurrencias(db):
+    """Procesa los gastos confirmados desde la última corrida. Devuelve cuántos leyó.
+
+    No hace commit. La marca (último id y huecos) se avanza al principio con un
+    UPDATE condicional: si otra corrida ya la movió, esta no hace nada.
+    """
+    marca = _marca(db)
+    desde, huecos_previos = marca.ultimo_id, marca.huecos
+    hasta = max(db.execute(select(func.max(Movimiento.id))).scalar() or 0, desde)
+
+    # Altas tardías: ids que faltaban bajo la marca y ya están confirmados
+    huecos, llegados = [], []
+    for a, b in json.loads(huecos_previos or "[]"):
+        presentes = list(_ids_entre(db, a, b))
+        llegados += presentes
+        huecos += _huecos(presentes, a, b)
+    if hasta == desde and not llegados:
+        return 0
+    if hasta > desde:
+        huecos += _huecos(_ids_entre(db, desde + 1, hasta), desde + 1, hasta)
+    limite = hasta - VENTANA_HUECOS
+    huecos = [[max(a, limite + 1), b] for a, b in huecos if b > limite]
+
+    tomado = db.execute(
+        update(MarcaProceso)
+        .where(
+            MarcaProceso.nombre == PROCESO,
+            MarcaProceso.ultimo_id == desde,
+            MarcaProceso.huecos.is_not_distinct_from(huecos_previos),
+        )
+        .values(ultimo_id=hasta, huecos=json.dumps(huecos))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not tomado:
+        return 0
+    db.expire(marca)
+
+    leidos, a_recalcular = 0, set()
+    cursor = desde
+    while True:
+        tanda = db.execute(
+            _consulta_gastos()
+            .where(Movimiento.id > cursor, Movimiento.id <= hasta)
+            .order_by(Movimiento.id)
+            .limit(TAMANO_TANDA)
+        ).all()
+        if not tanda:
+            break
+        cursor = tanda[-1].id
+        leidos += len(tanda)
+
+        tanda.sort(key=lambda f: (f.clave_descripcion, f.fecha, f.id))
+        estados = _estados(db, {f.clave_descripcion for f in tanda} - a_recalcular)
+        for clave, filas in groupby(tanda, key=lambda f: f.clave_descripcion):
+            if clave in a_recalcular:
+                continue
+            filas = list(filas)
+            estado = estados.get(clave)
+            if estado is None:
+                estado = _nuevo_estado(clave, filas[0].descripcion)
+                db.add(estado)
+            elif estado.ultima_fecha is not None and filas[0].fecha < estado.ultima_fecha:
+                # Llegó un cargo anterior al último conocido: los intervalos cambian
+                a_recalcular.add(clave)
+                continue
+            for fila in filas:
+                _sumar(estado, fila)
+        db.flush()
+
+    # Un alta tardía puede caer entre cargos ya sumados: su clave se rehace
+    a_recalcular |= claves_de(db, llegados)
+    if a_recalcular:
+        recalcular_claves(db, a_recalcular, hasta)
+    return leidos + len(llegados)
+
+
+def _periodo_cercano(dias):
+    return min(PERIODOS_DIAS.items(), key=lambda p: abs(dias - p[1]) / p[1])
+
+
+def listar_recurrencias(db, umbral=5, minimo=3, tolerancia_periodo=0.2, tolerancia_intervalo=0.25,
+                        tolerancia_monto=0.15, ahora=None):
+    """Cargos recurrentes según el estado guardado (no relee movimientos).
+
+    Una clave es recurrente si tiene al menos `minimo` cargos, su intervalo medio
+    está a menos de `tolerancia_periodo` de un periodo conocido (semanal..anual),
+    y el intervalo y el monto varían poco (coeficiente de variación). Las de
+    satisfacción promedio menor a `umbral` se marcan como insatisfactorias.
+    """
+    ahora = ahora or datetime.utcnow()
+    recurrentes = []
+    estados = db.execute(
+        select(Recurrencia).where(Recurrencia.ocurrencias >= minimo, Recurrencia.intervalos > 0)
+    ).scalars()
+    for r in estados:
+        dias = r.suma_dias / r.intervalos
+        if dias <= 0:
+            continue
+        periodo, dias_periodo = _periodo_cercano(dias)
+        cv_dias = math.sqrt(max(r.suma_dias2 / r.intervalos - dias * dias, 0)) / dias
+        monto = r.suma_monto / r.ocurrencias
+        cv_monto = math.sqrt(max(r.suma_monto2 / r.ocurrencias - monto * monto, 0)) / monto if monto else 0
+        if (abs(dias - dias_periodo) / dias_periodo > tolerancia_periodo
+                or cv_dias > tolerancia_intervalo or cv_monto > tolerancia_monto):
+            continue
+        nivel = r.suma_nivel / r.con_nivel if r.con_nivel else None
+        recurrentes.append({
+            "clave": r.clave,
+            "descripcion": r.descripcion,
+            "periodo": periodo,
+            "dias": round(dias, 1),
+            "monto": round(monto, 2),
+            "ultimo_monto": r.ultimo_monto,
+            "ocurrencias": r.ocurrencias,
+            "ultimo": r.ultima_fecha,
+            "activa": (ahora - r.ultima_fecha).total_seconds() <= 1.5 * dias_periodo * SEGUNDOS_POR_DIA,
+            "nivel_promedio": round(nivel, 2) if nivel is not None else None,
+            "insatisfactoria": nivel is not None and nivel < umbral,
+            "costo_anual": round(monto * 365.25 / dias_periodo, 2),
+        })
+    # Primero las suscripciones que no satisfacen, y dentro de cada grupo las más caras
+    recurrentes.sort(key=lambda r: (not r["insatisfactoria"], -r["costo_anual"]))
+    return recurrentes
+
+
+def detectar_recurrencias(db, **criterios):
+    """Procesa los gastos nuevos y devuelve los cargos recurrentes. No hace commit."""
+    actualizar_recurrencias(db)
+    return listar_recurrencias(db, **criterios)
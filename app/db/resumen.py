@@ -0,0 +1,154 @@
+"""Mantenimiento del resumen mensual (`ResumenMensual`).
+
+Cada escritura de movimientos suma o resta su aporte a la fila de su
+(mes, categoría, tipo, nivel) dentro de la misma transacción, así que los
+totales se leen del resumen y su costo depende de meses x categorías, no de la
+cantidad de movimientos. Para reparar el resumen desde cero:
+
+    python -m app.db.resumen
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import date
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from app.models.movimiento import Movimiento
+from app.models.resumen import ID_SIN_CATEGORIA, ResumenMensual
+from app.models.satisfaccion import MetricaSatisfaccion
+
+_resumen = ResumenMensual.__table__
+_CLAVE = ["mes", "categoria_id", "tipo", "nivel"]
+_VALORES = ["suma", "cantidad", "suma_nivel"]
+_INSERT_CON_UPSERT = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+# Movimientos antiguos sin fecha: se agrupan en un mes centinela
+MES_SIN_FECHA = date(1900, 1, 1)
+# Ids por consulta al leer aportes (muy por debajo del límite de parámetros)
+IDS_POR_CONSULTA = 1000
+FILAS_POR_TANDA = 5000
+
+
+def mes_de(fecha):
+    return date(fecha.year, fecha.month, 1) if fecha else MES_SIN_FECHA
+
+
+def _consulta_aportes():
+    return (
+        select(Movimiento.fecha, Movimiento.categoria_id, Movimiento.tipo, Movimiento.monto, MetricaSatisfaccion.nivel)
+        .outerjoin(MetricaSatisfaccion, MetricaSatisfaccion.movimiento_id == Movimiento.id)
+    )
+
+
+def leer_aportes(db, ids):
+    """(fecha, categoria_id, tipo, monto, nivel) de los movimientos indicados."""
+    ids = list(ids)
+    filas = []
+    for i in range(0, len(ids), IDS_POR_CONSULTA):
+        filas += db.execute(_consulta_aportes().where(Movimiento.id.in_(ids[i:i + IDS_POR_CONSULTA]))).all()
+    return filas
+
+
+def acumular(deltas, filas, signo=1):
+    """Suma (o resta, con signo=-1) el aporte de cada fila a su clave del resumen."""
+    for fecha, categoria_id, tipo, monto, nivel in filas:
+        clave = (mes_de(fecha), categoria_id or ID_SIN_CATEGORIA, tipo, nivel or 0)
+        d = deltas[clave]
+        d[0] += signo * (monto or 0)
+        d[1] += signo
+        d[2] += signo * (nivel or 0)
+    return deltas
+
+
+def nuevos_deltas():
+    return defaultdict(lambda: [0.0, 0, 0])
+
+
+def aplicar_deltas(db, deltas):
+    """Aplica los deltas al resumen con un upsert masivo. No hace commit.
+
+    Las filas van ordenadas por clave: dos transacciones que tocan las mismas
+    claves las bloquean en el mismo orden y no se produce un deadlock.
+    """
+    filas = [
+        dict(zip(_CLAVE + _VALORES, (*clave, *valores)))
+        for clave, valores in sorted(deltas.items())
+        if valores[1] or valores[0]
+    ]
+    if not filas:
+        return
+
+    crear_insert = _INSERT_CON_UPSERT.get(db.get_bind().dialect.name)
+    if crear_insert is not None:
+        consulta = crear_insert(_resumen)
+        db.execute(
+            consulta.on_conflict_do_update(
+                index_elements=_CLAVE,
+                set_={c: _resumen.c[c] + consulta.excluded[c] for c in _VALORES},
+            ),
+            filas,
+        )
+    else:
+        # Otros motores (p. ej. SQL Server): UPDATE y, si no existía la fila, INSERT
+        for fila in filas:
+            actualizadas = db.execute(
+                update(_resumen)
+                .where(*(_resumen.c[c] == fila[c] for c in _CLAVE))
+                .values({c: _resumen.c[c] + fila[c] for c in _VALORES})
+            ).rowcount
+            if not actualizadas:
+                db.execute(insert(_resumen), fila)
+
+    if any(f["cantidad"] < 0 for f in filas):
+        db.execute(delete(_resumen).where(_resumen.c.cantidad <= 0))
+
+
+def sumar_filas(db, filas):
+    """Suma al resumen filas (fecha, categoria_id, tipo, monto, nivel) recién insertadas."""
+    aplicar_deltas(db, acumular(nuevos_deltas(), filas))
+
+
+def sumar_movimientos(db, ids):
+    """Suma al resumen movimientos ya insertados (y sus métricas) en esta transacción."""
+    db.flush()
+    sumar_filas(db, leer_aportes(db, ids))
+
+
+@contextmanager
+def ajustar_resumen(db, ids):
+    """Envuelve ediciones o borrados de movimientos.
+
+    Resta el aporte de `ids` antes del bloque y suma el que quede después: un
+    borrado solo resta y una edición mueve el monto a su nueva clave.
+    """
+    ids = list(ids)
+    db.flush()
+    deltas = acumular(nuevos_deltas(), leer_aportes(db, ids), signo=-1)
+    yield
+    db.flush()
+    aplicar_deltas(db, acumular(deltas, leer_aportes(db, ids)))
+
+
+def reconstruir_resumen(db):
+    """Recalcula el resumen completo a partir de los movimientos. No hace commit.
+
+    Recorre los movimientos por tandas, así que la memoria depende del tamaño
+    del resumen y no de la cantidad de movimientos. Devuelve las filas escritas.
+    """
+    db.flush()
+    deltas = nuevos_deltas()
+    for filas in db.execute(_consulta_aportes().execution_options(yield_per=FILAS_POR_TANDA)).partitions():
+        acumular(deltas, filas)
+    db.execute(delete(_resumen))
+    filas = [dict(zip(_CLAVE + _VALORES, (*clave, *valores))) for clave, valores in deltas.items()]
+    if filas:
+        db.execute(insert(_resumen), filas)
+    return len(filas)
+
+
+if __name__ == "__main__":
+    from app.db.session import SessionLocal
+
+    print("--- Reconstruyendo resumen mensual ---")
+    with SessionLocal() as db:
+        filas = reconstruir_resumen(db)
+        db.commit()
+    print(f"✅ {filas} fila(s) de resumen.")
@@ -0,0 +1,89 @@
+"""Variante asíncrona de la capa de datos (SQLAlchemy asyncio).
+
+Usa la misma URL y configuración de pool que `app.db.session`, cambiando el
+driver por uno asíncrono: asyncpg para Postgres y aiosqlite para SQLite. Los
+scripts síncronos siguen usando `SessionLocal` sin cambios.
+"""
+import threading
+from uuid import uuid4
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from app.db.session import opciones_pool, resolver_url
+
+_DRIVERS_ASYNC = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+# Puerto del Transaction Pooler de Supabase (PgBouncer en modo transacción)
+_PUERTO_POOLER = 6543
+
+
+def url_async(url=None):
+    """Convierte la URL configurada a su driver asíncrono."""
+    url = resolver_url(url)
+    driver = _DRIVERS_ASYNC.get(url.get_backend_name())
+    if driver is None or url.drivername == driver:
+        return url
+    url = url.set(drivername=driver)
+    if driver == "postgresql+asyncpg" and "sslmode" in url.query:
+        # asyncpg no entiende sslmode; su equivalente es ssl
+        sslmode = url.query["sslmode"]
+        url = url.difference_update_query(["sslmode"]).update_query_dict({"ssl": sslmode})
+    return url
+
+
+def _nombre_sentencia():
+    return f"__asyncpg_{uuid4()}__"
+
+
+def crear_engine_async(url=None, **opciones):
+    """Fábrica de engines asíncronos; mismas variables de entorno que `crear_engine`."""
+    url = url_async(url)
+    kwargs = opciones_pool(url)
+    if url.get_backend_name() == "postgresql" and url.port == _PUERTO_POOLER:
+        # PgBouncer en modo transacción no soporta sentencias preparadas con nombre
+        # fijo: sin cachés y con un nombre único por sentencia, como indica
+        # SQLAlchemy, para evitar "prepared statement ... already exists"
+        kwargs["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": _nombre_sentencia,
+        }
+    kwargs.update(opciones)
+    return create_async_engine(url, **kwargs)
+
+
+_engine_async = None
+_lock_engine = threading.Lock()
+
+
+def obtener_engine_async():
+    """Devuelve el engine asíncrono compartido, creándolo en el primer uso."""
+    global _engine_async
+    if _engine_async is None:
+        with _lock_engine:
+            if _engine_async is None:
+                configurar_engine_async(crear_engine_async())
+    return _engine_async
+
+
+def configurar_engine_async(nuevo_engine):
+    """Reemplaza el engine asíncrono compartido (p. ej. aiosqlite para pruebas)."""
+    global _engine_async
+    _engine_async = nuevo_engine
+    AsyncSessionLocal.configure(bind=nuevo_engine)
+
+
+async def cerrar_engine_async():
+    """Cierra las conexiones del engine asíncrono, si llegó a crearse."""
+    if _engine_async is not None:
+        await _engine_async.dispose()
+
+
+class _FabricaSesionesAsync(async_sessionmaker):
+    """async_sessionmaker que se enlaza al engine recién al abrir la primera sesión."""
+
+    def __call__(self, **local_kw):
+        if _engine_async is None:
+            obtener_engine_async()
+        return super().__call__(**local_kw)
+
+
+# expire_on_commit=False: tras el commit no hay lazy loads (no se permiten en asyncio)
+AsyncSessionLocal = _FabricaSesionesAsync(class_=AsyncSession, autoflush=False, expire_on_commit=False)
@@ -1,20 +1,9 @@
-from app.db.session import Session
-from app.models.movimiento import Movimiento
-from sqlalchemy import func
+from app.db.session import SessionLocal
+from app.db import queries
 
 def calcular_balance():
-    session = Session()
-
-    ingresos = session.query(func.sum(Movimiento.monto))\
-        .filter(Movimiento.tipo == "INGRESO")\
-        .scalar() or 0
-
-    gastos = session.query(func.sum(Movimiento.monto))\
-        .filter(Movimiento.tipo == "GASTO")\
-        .scalar() or 0
-
-    session.close()
-
-    balance = ingresos - gastos
-
-    return ingresos, gastos, balance
+    session = SessionLocal()
+    try:
+        return queries.calcular_balance(session)
+    finally:
+        session.close()
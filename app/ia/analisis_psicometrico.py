@@ -1,35 +1,309 @@
+import os
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING
+import numpy as np
+from sqlalchemy import case, event, func, select
 from sqlalchemy.orm import Session
+from app.db.resumen import MES_SIN_FECHA, mes_de
+from app.models.meta import MetaAhorro
 from app.models.movimiento import Movimiento
+from app.models.resumen import ResumenMensual
 from app.models.satisfaccion import MetricaSatisfaccion
+from app.ia.simulador import proyectar_metas
 
-class MotorPsicometrico:
-    def __init__(self, db: Session):
-        self.db = db
+if TYPE_CHECKING:
+    # Solo para anotaciones: los scripts síncronos no necesitan greenlet
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+_MODELOS_ANALIZADOS = (Movimiento, MetricaSatisfaccion, ResumenMensual)
+
+# Ventanas móviles (en días) del gasto ineficiente
+VENTANAS_DIAS = (30, 90, 365)
+DIAS_POR_MES = 365 / 12
 
-    def calcular_costo_insatisfaccion(self):
-        """Busca gastos con satisfacción < 5 y suma el monto total."""
-        gastos_ineficientes = (
-            self.db.query(Movimiento)
-            .join(MetricaSatisfaccion)
-            .filter(MetricaSatisfaccion.nivel < 5)
-            .all()
+
+# --- Consultas compartidas por el motor síncrono y el asíncrono ---
+
+def consulta_costo_insatisfaccion(umbral=5, fecha_inicio=None, fecha_fin=None):
+    """Una sola consulta: SUM y COUNT se calculan en la base como funciones de
+    ventana y los detalles llegan como tuplas de columnas, sin construir
+    objetos ORM ni lanzar un SELECT extra por fila.
+    """
+    consulta = (
+        select(
+            Movimiento.descripcion,
+            Movimiento.monto,
+            MetricaSatisfaccion.nivel,
+            func.sum(Movimiento.monto).over().label("total"),
+            func.count().over().label("cantidad"),
         )
-        total_desperdiciado = sum(g.monto for g in gastos_ineficientes)
-        
+        .join(MetricaSatisfaccion, MetricaSatisfaccion.movimiento_id == Movimiento.id)
+        .where(MetricaSatisfaccion.nivel < umbral)
+    )
+    if fecha_inicio is not None:
+        consulta = consulta.where(Movimiento.fecha >= fecha_inicio)
+    if fecha_fin is not None:
+        consulta = consulta.where(Movimiento.fecha < fecha_fin)
+    return consulta
+
+
+def resumir_costo_insatisfaccion(filas):
+    # Las columnas de ventana se repiten en cada fila; sin filas no hay desperdicio
+    total_desperdiciado = filas[0].total if filas else 0
+    cantidad = filas[0].cantidad if filas else 0
+
+    return {
+        "total_ineficiente": total_desperdiciado,
+        "cantidad_gastos": cantidad,
+        "detalles": [
+            {"desc": desc, "monto": monto, "nivel": nivel}
+            for desc, monto, nivel, _, _ in filas
+        ]
+    }
+
+
+def _sumar_meses(mes, n):
+    total = mes.year * 12 + mes.month - 1 + n
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def _meses_entre(desde, hasta):
+    return (hasta.year - desde.year) * 12 + hasta.month - desde.month
+
+
+def consulta_ventanas(umbral, hasta, dias=VENTANAS_DIAS):
+    """Gasto ineficiente de varias ventanas móviles en una sola consulta.
+
+    Es un recorrido por rango sobre (tipo, fecha) acotado por la ventana más
+    larga; las ventanas más cortas salen de sumas condicionales sobre las
+    mismas filas.
+    """
+    columnas = []
+    for d in dias:
+        en_ventana = Movimiento.fecha >= hasta - timedelta(days=d)
+        columnas += [
+            func.coalesce(func.sum(case((en_ventana, Movimiento.monto), else_=0)), 0).label(f"total_{d}"),
+            func.count(case((en_ventana, 1))).label(f"cantidad_{d}"),
+        ]
+    return (
+        select(*columnas)
+        .join(MetricaSatisfaccion, MetricaSatisfaccion.movimiento_id == Movimiento.id)
+        .where(
+            Movimiento.tipo == "GASTO",
+            Movimiento.fecha >= hasta - timedelta(days=max(dias)),
+            Movimiento.fecha < hasta,
+            MetricaSatisfaccion.nivel < umbral,
+        )
+    )
+
+
+def resumir_ventanas(valores, dias=VENTANAS_DIAS):
+    """`valores`: total_<d> y cantidad_<d> por ventana (p. ej. `fila._mapping`)."""
+    ventanas = {}
+    for d in dias:
+        total = valores[f"total_{d}"]
+        ventanas[d] = {
+            "total": total,
+            "cantidad": valores[f"cantidad_{d}"],
+            "mensual": round(total * DIAS_POR_MES / d, 2), # Normalizado a un mes
+        }
+    return ventanas
+
+
+def _ineficientes_del_resumen(umbral):
+    # Gastos con métrica (nivel 0 = sin métrica) por debajo del umbral
+    return (ResumenMensual.tipo == "GASTO", ResumenMensual.nivel > 0, ResumenMensual.nivel < umbral)
+
+
+def consulta_tendencia(umbral, desde_mes, hasta_mes):
+    """Gasto ineficiente por mes en [desde_mes, hasta_mes], desde el resumen mensual."""
+    return (
+        select(ResumenMensual.mes, func.sum(ResumenMensual.suma), func.sum(ResumenMensual.cantidad))
+        .where(*_ineficientes_del_resumen(umbral), ResumenMensual.mes >= desde_mes, ResumenMensual.mes <= hasta_mes)
+        .group_by(ResumenMensual.mes)
+    )
+
+
+def resumir_tendencia(filas, desde_mes, meses):
+    """Serie mes a mes (los meses sin gasto ineficiente van en cero) con su variación."""
+    por_mes = {mes: (total, cantidad) for mes, total, cantidad in filas}
+    serie, anterior = [], None
+    for i in range(meses):
+        mes = _sumar_meses(desde_mes, i)
+        total, cantidad = por_mes.get(mes, (0, 0))
+        serie.append({
+            "mes": mes,
+            "total": total,
+            "cantidad": cantidad,
+            "variacion": None if anterior is None else total - anterior,
+            "variacion_pct": round((total / anterior - 1) * 100, 1) if anterior else None,
+        })
+        anterior = total
+    return serie
+
+
+def consulta_promedio(umbral, desde_mes, hasta_mes):
+    """(primer mes con gastos, gasto ineficiente en [desde_mes, hasta_mes)) del resumen."""
+    en_rango = (ResumenMensual.mes >= desde_mes) & (ResumenMensual.mes < hasta_mes)
+    ineficiente = (ResumenMensual.nivel > 0) & (ResumenMensual.nivel < umbral)
+    return select(
+        func.min(ResumenMensual.mes).label("primer_mes"),
+        func.coalesce(func.sum(case((en_rango & ineficiente, ResumenMensual.suma), else_=0)), 0).label("total"),
+    ).where(ResumenMensual.tipo == "GASTO")
+
+
+def resumir_promedio(primer_mes, total, desde_mes, hasta_mes):
+    """Promedio sobre los meses completos con historia: 0.0 si no hay gastos y
+    None si todavía no hay ningún mes completo."""
+    if primer_mes is None:
+        return 0.0
+    meses = _meses_entre(max(desde_mes, primer_mes), hasta_mes)
+    return round(total / meses, 2) if meses > 0 else None
+
+
+def consulta_metas():
+    return select(MetaAhorro.id, MetaAhorro.nombre, MetaAhorro.monto_objetivo, MetaAhorro.monto_actual)
+
+
+def consulta_burbujas():
+    return (
+        select(Movimiento.descripcion, Movimiento.clave_descripcion, Movimiento.monto, MetricaSatisfaccion.nivel)
+        .join(MetricaSatisfaccion, MetricaSatisfaccion.movimiento_id == Movimiento.id)
+        .where(Movimiento.tipo == "GASTO")
+    )
+
+
+def resumir_burbujas(filas):
+    total_gastos = sum(monto for _, _, monto, _ in filas) or 1
+    return [
+        {
+            "descripcion": descripcion,
+            "clave": clave,
+            "monto": monto,
+            "satisfaccion": nivel,
+            "peso": (monto / total_gastos) * 1000 # Para el tamaño de la burbuja
+        }
+        for descripcion, clave, monto, nivel in filas
+    ]
+
+
+def consulta_burbujas_columnas():
+    """Gastos del mapa con el total de gastos como función de ventana."""
+    return consulta_burbujas().add_columns(func.sum(Movimiento.monto).over().label("total"))
+
+
+def consulta_burbujas_grupos():
+    """Gastos del mapa agregados por descripción normalizada en la base.
+
+    Una fila por clave con la suma, el promedio de monto y de satisfacción y la
+    cantidad: los tamaños y las cantidades son exactos aunque haya millones de gastos.
+    """
+    return (
+        select(
+            func.min(Movimiento.descripcion).label("descripcion"),
+            Movimiento.clave_descripcion,
+            func.sum(Movimiento.monto).label("total"),
+            func.avg(Movimiento.monto).label("monto"),
+            func.avg(MetricaSatisfaccion.nivel).label("satisfaccion"),
+            func.count().label("cantidad"),
+        )
+        .join(MetricaSatisfaccion, MetricaSatisfaccion.movimiento_id == Movimiento.id)
+        .where(Movimiento.tipo == "GASTO")
+        .group_by(Movimiento.clave_descripcion)
+    )
+
+
+def grupos_burbujas(filas):
+    """Arreglos paralelos (descripcion, clave, total, monto, satisfaccion, cantidad)."""
+    descripcion, clave, total, monto, nivel, cantidad = zip(*filas) if filas else ((),) * 6
+    return {
+        "descripcion": np.array(descripcion, dtype=object),
+        "clave": np.array(clave, dtype=object),
+        "total": np.array(total, dtype=np.float64),
+        "monto": np.array(monto, dtype=np.float64),
+        "satisfaccion": np.array(nivel, dtype=np.float64),
+        "cantidad": np.array(cantidad, dtype=np.int64),
+    }
+
+
+def columnas_burbujas(filas):
+    """Arreglos paralelos (descripcion, clave, monto, satisfaccion, peso)."""
+    if not filas:
         return {
-            "total_ineficiente": total_desperdiciado,
-            "cantidad_gastos": len(gastos_ineficientes),
-            "detalles": [
-                {"desc": g.descripcion, "monto": g.monto, "nivel": g.satisfaccion.nivel}
-                for g in gastos_ineficientes
-            ]
+            "descripcion": np.array([], dtype=object), "clave": np.array([], dtype=object),
+            "monto": np.array([]), "satisfaccion": np.array([]), "peso": np.array([]),
         }
+    descripcion, clave, monto, nivel, total = zip(*filas)
+    monto = np.array(monto, dtype=np.float64)
+    return {
+        "descripcion": np.array(descripcion, dtype=object),
+        "clave": np.array(clave, dtype=object),
+        "monto": monto,
+        "satisfaccion": np.array(nivel, dtype=np.float64),
+        "peso": monto / (total[0] or 1) * 1000,
+    }
 
-    def simular_alcance_meta(self, monto_meta: float, ahorro_mensual_base: float):
-        """Calcula meses para alcanzar la meta con y sin recorte de gastos."""
-        costo_info = self.calcular_costo_insatisfaccion()
-        desperdicio_mensual = costo_info["total_ineficiente"]
-        
+
+_SNAPSHOTS = "analisis_psicometrico.snapshots"
+
+
+def _invalidar_al_hacer_flush(session, flush_context):
+    """Invalida el snapshot si la sesión escribió movimientos o métricas."""
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, _MODELOS_ANALIZADOS):
+            session.info[_SNAPSHOTS].clear()
+            return
+
+
+def _invalidar_al_ejecutar(orm_execute_state):
+    """Invalida el snapshot ante INSERT/UPDATE/DELETE masivos por la sesión."""
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info[_SNAPSHOTS].clear()
+
+
+def _invalidar_al_terminar(session, transaction):
+    # Commit, rollback o close: la próxima lectura puede ver otros datos
+    session.info[_SNAPSHOTS].clear()
+
+
+def snapshots_de(sesion: Session):
+    """Snapshot del análisis de una sesión, guardado en `sesion.info`.
+
+    Los listeners se registran una sola vez por sesión (no por motor), así que
+    crear motores sobre una sesión larga no los acumula ni retiene motores viejos.
+    """
+    if _SNAPSHOTS not in sesion.info:
+        sesion.info[_SNAPSHOTS] = {}
+        event.listen(sesion, "after_flush", _invalidar_al_hacer_flush)
+        event.listen(sesion, "do_orm_execute", _invalidar_al_ejecutar)
+        event.listen(sesion, "after_transaction_end", _invalidar_al_terminar)
+    return sesion.info[_SNAPSHOTS]
+
+
+class MotorPsicometrico:
+    """Diagnóstico de satisfacción y simulaciones sobre una sesión.
+
+    Los resultados quedan en el snapshot de la sesión (`snapshots_de`), que
+    comparten todos sus motores hasta que la sesión escribe movimientos o
+    métricas o termina su transacción.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._snapshots = snapshots_de(db)
+
+    def invalidar_snapshot(self):
+        self._snapshots.clear()
+
+    @staticmethod
+    def _rango_meses(meses, hasta):
+        # Meses completos previos al mes de `hasta` y ese mes (en curso)
+        mes_actual = mes_de(hasta or datetime.utcnow())
+        return _sumar_meses(mes_actual, -meses), mes_actual
+
+    @staticmethod
+    def _proyectar_meta(monto_meta, ahorro_mensual_base, desperdicio_mensual):
         # Escenario A: Ahorro normal
         meses_normal = monto_meta / ahorro_mensual_base if ahorro_mensual_base > 0 else 0
         
@@ -44,20 +318,275 @@ class MotorPsicometrico:
             "meses_optimizado": round(meses_optimizado, 1),
             "tiempo_ahorrado": round(meses_normal - meses_optimizado, 1)
         }
-    
+
+    # --- Lecturas (la variante sobre la instantánea las reemplaza) ---
+
+    def _consultar_costo_insatisfaccion(self, umbral, fecha_inicio, fecha_fin):
+        filas = self.db.execute(consulta_costo_insatisfaccion(umbral, fecha_inicio, fecha_fin)).all()
+        return resumir_costo_insatisfaccion(filas)
+
+    def _consultar_ventanas(self, umbral, hasta, dias):
+        return resumir_ventanas(self.db.execute(consulta_ventanas(umbral, hasta, dias)).one()._mapping, dias)
+
+    def _consultar_tendencia(self, umbral, desde_mes, hasta_mes):
+        """Filas (mes, total, cantidad) del gasto ineficiente en [desde_mes, hasta_mes]."""
+        return self.db.execute(consulta_tendencia(umbral, desde_mes, hasta_mes)).all()
+
+    def _consultar_promedio(self, umbral, desde_mes, hasta_mes):
+        """(primer mes con gastos, gasto ineficiente en [desde_mes, hasta_mes))."""
+        fila = self.db.execute(consulta_promedio(umbral, desde_mes, hasta_mes)).one()
+        return fila.primer_mes, fila.total
+
+    def _consultar_metas(self):
+        return self.db.execute(consulta_metas()).all()
+
+    # --- Análisis ---
+
+    def calcular_costo_insatisfaccion(self, umbral: int = 5, fecha_inicio=None, fecha_fin=None):
+        """Busca gastos con satisfacción < umbral y suma el monto total.
+
+        El resultado se guarda en el snapshot del motor; mientras no se escriban
+        movimientos, las siguientes llamadas no vuelven a consultar la base.
+        """
+        clave = (umbral, fecha_inicio, fecha_fin)
+        if clave not in self._snapshots:
+            self._snapshots[clave] = self._consultar_costo_insatisfaccion(umbral, fecha_inicio, fecha_fin)
+        return self._snapshots[clave]
+
+    def calcular_ventanas(self, umbral: int = 5, hasta=None, dias=VENTANAS_DIAS):
+        """Gasto ineficiente en las últimas 30/90/365 días hasta `hasta` (ahora por defecto).
+
+        Por ventana: total, cantidad y "mensual" (el total llevado a 30,4 días).
+        """
+        clave = ("ventanas", umbral, hasta, tuple(dias))
+        if clave not in self._snapshots:
+            self._snapshots[clave] = self._consultar_ventanas(umbral, hasta or datetime.utcnow(), tuple(dias))
+        return self._snapshots[clave]
+
+    def tendencia_mensual(self, umbral: int = 5, meses: int = 12, hasta=None):
+        """Gasto ineficiente de los últimos `meses` meses (el último es el mes en curso),
+        con la variación contra el mes anterior. Se lee del resumen mensual.
+        """
+        clave = ("tendencia", umbral, meses, hasta)
+        if clave not in self._snapshots:
+            _, mes_actual = self._rango_meses(meses, hasta)
+            desde_mes = _sumar_meses(mes_actual, 1 - meses)
+            filas = self._consultar_tendencia(umbral, desde_mes, mes_actual)
+            self._snapshots[clave] = resumir_tendencia(filas, desde_mes, meses)
+        return self._snapshots[clave]
+
+    def promedio_mensual(self, umbral: int = 5, meses: int = 12, hasta=None):
+        """Gasto ineficiente promedio por mes: el valor que usan las simulaciones.
+
+        Promedia los últimos `meses` meses completos (o los que haya desde el
+        primer gasto). Si todavía no hay un mes completo, usa la ventana de 30 días.
+        """
+        clave = ("promedio", umbral, meses, hasta)
+        if clave not in self._snapshots:
+            desde_mes, mes_actual = self._rango_meses(meses, hasta)
+            primer_mes, total = self._consultar_promedio(umbral, desde_mes, mes_actual)
+            promedio = resumir_promedio(primer_mes, total, desde_mes, mes_actual)
+            if promedio is None:
+                promedio = self.calcular_ventanas(umbral, hasta, (30,))[30]["mensual"]
+            self._snapshots[clave] = promedio
+        return self._snapshots[clave]
+
+    def simular_alcance_meta(self, monto_meta: float, ahorro_mensual_base: float):
+        """Calcula meses para alcanzar la meta con y sin recorte de gastos.
+
+        El recorte es el gasto ineficiente promedio por mes (`promedio_mensual`),
+        no la suma de todo el historial.
+        """
+        desperdicio_mensual = self.promedio_mensual()
+        return self._proyectar_meta(monto_meta, ahorro_mensual_base, desperdicio_mensual)
+
+    def simular_metas(self, escenarios):
+        """Simula muchas metas a partir de pares (monto_meta, ahorro_mensual_base).
+
+        Todas las proyecciones salen del mismo snapshot: la base se consulta a lo
+        sumo una vez por rejilla, sin importar cuántas metas se simulen.
+        """
+        desperdicio_mensual = self.promedio_mensual()
+        return [
+            self._proyectar_meta(monto_meta, ahorro_base, desperdicio_mensual)
+            for monto_meta, ahorro_base in escenarios
+        ]
+
+    def proyectar_metas(self, ahorro_mensual, metas=None, **opciones):
+        """Proyección vectorizada (ver `app.ia.simulador.proyectar_metas`).
+
+        Si no se pasan metas se proyectan todas las `MetaAhorro` guardadas, leídas
+        como columnas en una sola consulta. El desperdicio sale del snapshot.
+        """
+        if metas is None:
+            metas = self._consultar_metas()
+        desperdicio_mensual = self.promedio_mensual()
+        resultado = proyectar_metas(metas, ahorro_mensual, desperdicio_mensual, **opciones)
+        resultado["nombres"] = [m.nombre for m in metas]
+        return resultado
+
     def preparar_datos_burbujas(self):
         """Prepara datos para el gráfico: X=Monto, Y=Satisfacción, Tamaño=Peso."""
-        movimientos = self.db.query(Movimiento).join(MetricaSatisfaccion).all()
-        total_gastos = sum(m.monto for m in movimientos if m.tipo == "GASTO") or 1
-        
-        datos = []
-        for m in movimientos:
-            if m.tipo == "GASTO":
-                datos.append({
-                    "descripcion": m.descripcion,
-                    "monto": m.monto,
-                    "satisfaccion": m.satisfaccion.nivel,
-                    "peso": (m.monto / total_gastos) * 1000 # Para el tamaño de la burbuja
-                })
-        return datos
-    
\ No newline at end of file
+        return resumir_burbujas(self.db.execute(consulta_burbujas()).all())
+
+    def columnas_burbujas(self, max_puntos=None):
+        """Igual que `preparar_datos_burbujas` pero en arreglos.
+
+        Con más de `max_puntos` gastos llegan ya agrupados por descripción
+        (`grupos_burbujas`, con columna `cantidad`) y no se leen fila por fila.
+        """
+        if max_puntos is not None:
+            grupos = grupos_burbujas(self.db.execute(consulta_burbujas_grupos()).all())
+            if grupos["cantidad"].sum() > max_puntos:
+                return grupos
+        return columnas_burbujas(self.db.execute(consulta_burbujas_columnas()).all())
+
+
+class MotorPsicometricoInstantanea(MotorPsicometrico):
+    """MotorPsicometrico sobre la copia local en Parquet (`app.db.instantanea`).
+
+    Cada análisis lee directamente las particiones por mes (memory-mapped),
+    solo con las columnas y los meses que necesita; no usa la base.
+    """
+
+    def __init__(self, directorio=None):
+        from app.db import instantanea # pyarrow solo si se usa
+
+        self.db = None
+        self._instantanea = instantanea
+        self.directorio = directorio or instantanea.DIRECTORIO
+        self._snapshots = {} # La copia no cambia mientras se analiza
+
+    def _leer(self, columnas, **filtros):
+        return self._instantanea.leer_movimientos(self.directorio, columnas, **filtros)
+
+    def _ineficientes(self, umbral, desde, hasta):
+        """Gastos con métrica y satisfacción < umbral en [desde, hasta)."""
+        gastos = self._leer(("fecha", "monto", "nivel"), tipo="GASTO", desde=desde, hasta=hasta)
+        return gastos[(gastos["nivel"] < umbral).fillna(False)]
+
+    def _consultar_costo_insatisfaccion(self, umbral, fecha_inicio, fecha_fin):
+        filas = self._leer(("descripcion", "monto", "nivel"), desde=fecha_inicio, hasta=fecha_fin)
+        filas = filas[(filas["nivel"] < umbral).fillna(False)]
+        return {
+            "total_ineficiente": float(filas["monto"].sum()) if len(filas) else 0,
+            "cantidad_gastos": len(filas),
+            "detalles": [
+                {"desc": desc, "monto": float(monto), "nivel": int(nivel)}
+                for desc, monto, nivel in zip(filas["descripcion"], filas["monto"], filas["nivel"])
+            ],
+        }
+
+    def _consultar_ventanas(self, umbral, hasta, dias):
+        gastos = self._ineficientes(umbral, hasta - timedelta(days=max(dias)), hasta)
+        valores = {}
+        for d in dias:
+            montos = gastos["monto"][gastos["fecha"] >= hasta - timedelta(days=d)]
+            valores[f"total_{d}"] = float(montos.sum())
+            valores[f"cantidad_{d}"] = len(montos)
+        return resumir_ventanas(valores, dias)
+
+    def _consultar_tendencia(self, umbral, desde_mes, hasta_mes):
+        gastos = self._ineficientes(umbral, desde_mes, _sumar_meses(hasta_mes, 1))
+        por_mes = gastos.groupby(gastos["fecha"].dt.to_period("M"))["monto"].agg(["sum", "size"])
+        return [(periodo.start_time.date(), float(total), int(cantidad))
+                for periodo, (total, cantidad) in por_mes.iterrows()]
+
+    def _consultar_promedio(self, umbral, desde_mes, hasta_mes):
+        fechas = self._leer(("fecha",), tipo="GASTO")["fecha"]
+        if fechas.empty:
+            return None, 0
+        primer_mes = MES_SIN_FECHA if fechas.isna().any() else mes_de(fechas.min())
+        return primer_mes, float(self._ineficientes(umbral, desde_mes, hasta_mes)["monto"].sum())
+
+    def _consultar_metas(self):
+        metas = self._instantanea.leer_tabla(self.directorio, "metas_ahorro")
+        return list(metas.fillna({"monto_actual": 0.0}).itertuples(index=False))
+
+    def _gastos_burbujas(self):
+        gastos = self._leer(("descripcion", "clave", "monto", "nivel"), tipo="GASTO")
+        return gastos.dropna(subset=["nivel"]).astype({"nivel": "int64"})
+
+    def preparar_datos_burbujas(self):
+        gastos = self._gastos_burbujas()
+        return resumir_burbujas(list(zip(gastos["descripcion"], gastos["clave"], gastos["monto"], gastos["nivel"])))
+
+    def columnas_burbujas(self, max_puntos=None):
+        gastos = self._gastos_burbujas()
+        if max_puntos is not None and len(gastos) > max_puntos:
+            grupos = gastos.groupby("clave", sort=False, dropna=False).agg(
+                descripcion=("descripcion", "min"), total=("monto", "sum"), monto=("monto", "mean"),
+                satisfaccion=("nivel", "mean"), cantidad=("monto", "size"),
+            )
+            return grupos_burbujas(list(zip(
+                grupos["descripcion"], grupos.index, grupos["total"], grupos["monto"],
+                grupos["satisfaccion"], grupos["cantidad"],
+            )))
+        total = gastos["monto"].sum()
+        return columnas_burbujas([
+            (descripcion, clave, monto, nivel, total)
+            for descripcion, clave, monto, nivel in zip(gastos["descripcion"], gastos["clave"], gastos["monto"], gastos["nivel"])
+        ])
+
+
+@contextmanager
+def motor_analisis():
+    """Motor para los scripts de diagnóstico.
+
+    Con INSTANTANEA_DIR definida lee la copia local en Parquet y no toca la
+    base; si no, abre (y al salir cierra) una sesión.
+    """
+    directorio = os.getenv("INSTANTANEA_DIR")
+    if directorio:
+        yield MotorPsicometricoInstantanea(directorio)
+        return
+    from app.db.session import SessionLocal
+
+    with SessionLocal() as db:
+        yield MotorPsicometrico(db)
+
+
+class MotorPsicometricoAsync:
+    """Versión asíncrona de MotorPsicometrico para los handlers async de FastAPI.
+
+    Cada método corre el del motor síncrono dentro de `AsyncSession.run_sync`:
+    las consultas y el snapshot son los mismos y el event loop no se bloquea
+    mientras se espera a la base.
+    """
+
+    def __init__(self, db: "AsyncSession"):
+        self.db = db
+        self._motor = MotorPsicometrico(db.sync_session)
+
+    async def _en_sesion(self, metodo, *args, **kwargs):
+        return await self.db.run_sync(lambda _: getattr(self._motor, metodo)(*args, **kwargs))
+
+    def invalidar_snapshot(self):
+        self._motor.invalidar_snapshot()
+
+    async def calcular_costo_insatisfaccion(self, umbral: int = 5, fecha_inicio=None, fecha_fin=None):
+        return await self._en_sesion("calcular_costo_insatisfaccion", umbral, fecha_inicio, fecha_fin)
+
+    async def calcular_ventanas(self, umbral: int = 5, hasta=None, dias=VENTANAS_DIAS):
+        return await self._en_sesion("calcular_ventanas", umbral, hasta, dias)
+
+    async def tendencia_mensual(self, umbral: int = 5, meses: int = 12, hasta=None):
+        return await self._en_sesion("tendencia_mensual", umbral, meses, hasta)
+
+    async def promedio_mensual(self, umbral: int = 5, meses: int = 12, hasta=None):
+        return await self._en_sesion("promedio_mensual", umbral, meses, hasta)
+
+    async def simular_alcance_meta(self, monto_meta: float, ahorro_mensual_base: float):
+        return await self._en_sesion("simular_alcance_meta", monto_meta, ahorro_mensual_base)
+
+    async def simular_metas(self, escenarios):
+        return await self._en_sesion("simular_metas", escenarios)
+
+    async def proyectar_metas(self, ahorro_mensual, metas=None, **opciones):
+        return await self._en_sesion("proyectar_metas", ahorro_mensual, metas, **opciones)
+
+    async def preparar_datos_burbujas(self):
+        return await self._en_sesion("preparar_datos_burbujas")
+
+    async def columnas_burbujas(self, max_puntos=None):
+        return await self._en_sesion("columnas_burbujas", max_puntos)
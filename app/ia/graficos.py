@@ -0,0 +1,123 @@
+"""Mapa de Valor (monto vs. satisfacción) construido sobre arreglos.
+
+Un solo `scatter` para todos los puntos y etiquetas solo para las burbujas más
+grandes. Con muchos gastos, los puntos se agregan por descripción normalizada
+(en la base, ver `MotorPsicometrico.columnas_burbujas(max_puntos=...)`) antes
+de dibujar, así que el costo de render no depende de la cantidad de gastos.
+"""
+import io
+import numpy as np
+import pandas as pd
+from matplotlib import colormaps
+from matplotlib.figure import Figure
+
+# Hasta aquí se dibuja un punto por gasto; por encima, uno por descripción
+MAX_PUNTOS = 2000
+# Descripciones que se dibujan al agregar; el resto va a "Otros"
+MAX_GRUPOS = 300
+MAX_ETIQUETAS = 15
+ESCALA_TAMANO = 15000 # Igual que antes: peso (por mil del total) * 15
+TAMANO_MAXIMO = 3000
+OTROS = "Otros"
+
+
+def preparar_burbujas(datos, max_puntos=MAX_PUNTOS, max_grupos=MAX_GRUPOS):
+    """DataFrame listo para dibujar a partir de `preparar_datos_burbujas` o de
+    `columnas_burbujas` (lista de dicts o dict de arreglos, por gasto o ya
+    agrupados por descripción con `cantidad` y `total`).
+
+    Columnas: clave, descripcion, monto, satisfaccion, cantidad, tamano. Si hay
+    más de `max_puntos` gastos, cada fila es una descripción: monto y
+    satisfacción promedio, y tamaño según su parte del gasto total.
+    """
+    if "cantidad" in datos:
+        grupos = pd.DataFrame(datos, columns=["clave", "descripcion", "total", "monto", "satisfaccion", "cantidad"])
+        return _limitar_grupos(grupos.set_index("clave"), max_grupos)
+
+    gastos = pd.DataFrame(datos, columns=["descripcion", "clave", "monto", "satisfaccion"])
+    if gastos.empty:
+        return gastos.assign(cantidad=[], tamano=[])
+    gastos["clave"] = gastos["clave"].fillna(gastos["descripcion"])
+    total = gastos["monto"].sum() or 1
+
+    if len(gastos) <= max_puntos:
+        return gastos.assign(
+            cantidad=1,
+            tamano=np.minimum(gastos["monto"] / total * ESCALA_TAMANO, TAMANO_MAXIMO),
+        )
+
+    grupos = gastos.groupby("clave", sort=False).agg(
+        descripcion=("descripcion", "first"),
+        total=("monto", "sum"),
+        monto=("monto", "mean"),
+        satisfaccion=("satisfaccion", "mean"),
+        cantidad=("monto", "size"),
+    )
+    return _limitar_grupos(grupos, max_grupos)
+
+
+def _limitar_grupos(grupos, max_grupos):
+    """Deja las `max_grupos - 1` descripciones de mayor gasto y junta el resto en "Otros"."""
+    if grupos.empty:
+        return grupos.drop(columns="total").assign(tamano=[]).reset_index()
+    total = grupos["total"].sum() or 1
+    if len(grupos) > max_grupos:
+        grupos = grupos.sort_values("total", ascending=False)
+        resto = grupos.iloc[max_grupos - 1:]
+        otros = pd.DataFrame({
+            "descripcion": [OTROS],
+            "total": [resto["total"].sum()],
+            "monto": [resto["total"].sum() / resto["cantidad"].sum()],
+            "satisfaccion": [np.average(resto["satisfaccion"], weights=resto["cantidad"])],
+            "cantidad": [resto["cantidad"].sum()],
+        }, index=pd.Index([OTROS], name="clave"))
+        grupos = pd.concat([grupos.iloc[:max_grupos - 1], otros])
+
+    grupos["tamano"] = np.minimum(grupos["total"] / total * ESCALA_TAMANO, TAMANO_MAXIMO)
+    return grupos.drop(columns="total").reset_index()
+
+
+def colores_por_clave(claves, paleta="tab20"):
+    """Color fijo por clave de descripción (mismo color en el pastel y en el mapa)."""
+    unicas = sorted(set(claves))
+    mapa = colormaps[paleta]
+    return {clave: mapa(i / len(unicas)) for i, clave in enumerate(unicas)}
+
+
+def dibujar_burbujas(ax, burbujas, colores=None, max_etiquetas=MAX_ETIQUETAS):
+    """Dibuja el mapa en `ax` con un único scatter.
+
+    Sin `colores` se colorea por satisfacción (escala RdYlGn). Devuelve la
+    colección del scatter (sirve para una barra de color).
+    """
+    if colores is None:
+        color = {"c": burbujas["satisfaccion"].to_numpy(), "cmap": "RdYlGn", "vmin": 1, "vmax": 10}
+    else:
+        color = {"color": [colores.get(c, "#cccccc") for c in burbujas["clave"]]}
+    puntos = ax.scatter(
+        burbujas["monto"].to_numpy(),
+        burbujas["satisfaccion"].to_numpy(),
+        s=burbujas["tamano"].to_numpy(),
+        alpha=0.7,
+        edgecolors="white",
+        **color,
+    )
+
+    # Solo las burbujas más grandes llevan nombre; con miles serían ilegibles
+    for fila in burbujas.nlargest(max_etiquetas, "tamano").itertuples():
+        etiqueta = fila.descripcion if fila.cantidad == 1 else f"{fila.descripcion} (x{fila.cantidad})"
+        ax.annotate(f" {etiqueta}", (fila.monto, fila.satisfaccion), fontsize=9, fontweight="bold")
+
+    ax.set_xlabel("Monto Invertido ($)")
+    ax.set_ylabel("Nivel de Satisfacción")
+    ax.grid(True, linestyle="--", alpha=0.5)
+    return puntos
+
+
+def figura_burbujas_png(burbujas, colores=None, dpi=100):
+    """PNG del mapa (bytes): se puede guardar en caché y mostrar con st.image."""
+    fig = Figure(figsize=(10, 5))
+    dibujar_burbujas(fig.add_subplot(), burbujas, colores)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=dpi, bbox_inches="tight")
+    return buffer.getvalue()
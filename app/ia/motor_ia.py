@@ -0,0 +1,156 @@
+"""Motor de patrones de gasto sobre columnas (NumPy / pandas).
+
+Los gastos se cargan una sola vez como arreglos y todos los puntajes salen de
+operaciones vectorizadas (bincount, argsort, diff) sin bucles por movimiento:
+
+- costo por punto de satisfacción y tasa de arrepentimiento por categoría,
+- gasto impulsivo: rachas de gastos pequeños con satisfacción baja.
+
+Las suscripciones salen del detector incremental de `app.db.recurrencias`.
+"""
+import numpy as np
+import pandas as pd
+from app.db.cargador import cargar_movimientos_df
+from app.db.recurrencias import listar_recurrencias
+from app.models.movimiento import SIN_CATEGORIA
+
+COLUMNAS = ["fecha", "descripcion", "monto", "categoria", "nivel"]
+# Gastos sin métrica: nivel neutro, el mismo que usa el importador de extractos
+NIVEL_NEUTRO = 5
+
+
+def cargar_gastos(db):
+    """Todos los gastos como DataFrame columnar (una sola consulta, sin objetos ORM)."""
+    return _con_sin_categoria(cargar_movimientos_df(db, COLUMNAS, tipo="GASTO"))
+
+
+def _con_sin_categoria(gastos):
+    categoria = gastos["categoria"]
+    if SIN_CATEGORIA not in categoria.cat.categories:
+        categoria = categoria.cat.add_categories([SIN_CATEGORIA])
+    gastos["categoria"] = categoria.fillna(SIN_CATEGORIA)
+    return gastos
+
+
+def _a_fecha(segundos):
+    return np.datetime64(int(segundos), "s").item()
+
+
+def puntuar_categorias(codigos, nombres, monto, nivel, bajo):
+    """Costo por punto de satisfacción y arrepentimiento por categoría."""
+    k = len(nombres)
+    total = np.bincount(codigos, weights=monto, minlength=k)
+    puntos = np.bincount(codigos, weights=nivel, minlength=k)
+    cantidad = np.bincount(codigos, minlength=k)
+    arrepentido = np.bincount(codigos, weights=monto * bajo, minlength=k)
+
+    costo_por_punto = total / np.maximum(puntos, 1)
+    categorias = [
+        {
+            "categoria": nombres[i],
+            "total": round(float(total[i]), 2),
+            "cantidad": int(cantidad[i]),
+            "nivel_promedio": round(float(puntos[i] / cantidad[i]), 2),
+            "costo_por_punto": round(float(costo_por_punto[i]), 2),
+            "arrepentimiento": round(float(arrepentido[i] / total[i]), 3) if total[i] else 0.0,
+        }
+        for i in np.argsort(-costo_por_punto)
+        if cantidad[i]
+    ]
+    return categorias
+
+
+def detectar_impulsivos(t, monto, bajo, monto_pequeno, ventana_horas=24, minimo=3, limite=10):
+    """Rachas de al menos `minimo` gastos pequeños (<= monto_pequeno) y poco
+    satisfactorios, separados entre sí por menos de `ventana_horas`.
+
+    `t` son segundos ordenados de menor a mayor.
+    """
+    candidatos = bajo & (monto <= monto_pequeno)
+    tc, mc = t[candidatos], monto[candidatos]
+    if len(tc) == 0:
+        return {"total": 0.0, "cantidad": 0, "monto_pequeno": float(monto_pequeno), "rachas": []}
+
+    cortes = np.diff(tc) > ventana_horas * 3600
+    racha = np.concatenate(([0], np.cumsum(cortes)))
+    tamano = np.bincount(racha)
+    total = np.bincount(racha, weights=mc)
+    inicio = tc[np.concatenate(([0], np.flatnonzero(cortes) + 1))]
+    fin = tc[np.concatenate((np.flatnonzero(cortes), [len(tc) - 1]))]
+
+    impulsivas = np.flatnonzero(tamano >= minimo)
+    mayores = impulsivas[np.argsort(-total[impulsivas])][:limite]
+    return {
+        "total": round(float(total[impulsivas].sum()), 2),
+        "cantidad": int(tamano[impulsivas].sum()),
+        "monto_pequeno": float(monto_pequeno),
+        "rachas": [
+            {
+                "inicio": _a_fecha(inicio[r]),
+                "fin": _a_fecha(fin[r]),
+                "cantidad": int(tamano[r]),
+                "total": round(float(total[r]), 2),
+            }
+            for r in mayores
+        ],
+    }
+
+
+def puntuar(gastos, umbral=5, cuantil_pequeno=0.25, ventana_horas=24, minimo_racha=3):
+    """Todos los puntajes sobre un DataFrame con las columnas de `COLUMNAS`."""
+    if gastos.empty:
+        return {"movimientos": 0, "total": 0.0, "arrepentimiento": 0.0, "categorias": [],
+                "impulsivos": {"total": 0.0, "cantidad": 0, "monto_pequeno": 0.0, "rachas": []}}
+
+    monto = gastos["monto"].to_numpy(dtype=np.float64)
+    nivel = gastos["nivel"].fillna(NIVEL_NEUTRO).to_numpy(dtype=np.float64)
+    t = pd.to_datetime(gastos["fecha"]).to_numpy(dtype="datetime64[s]").astype(np.int64)
+    bajo = nivel < umbral
+
+    orden = np.argsort(t, kind="stable")
+    cod_cat, nombres_cat = pd.factorize(gastos["categoria"].fillna(SIN_CATEGORIA))
+    total = float(monto.sum())
+
+    return {
+        "movimientos": len(monto),
+        "total": round(total, 2),
+        "arrepentimiento": round(float(monto[bajo].sum()) / total, 3) if total else 0.0,
+        "categorias": puntuar_categorias(cod_cat, list(nombres_cat), monto, nivel, bajo),
+        "impulsivos": detectar_impulsivos(
+            t[orden], monto[orden], bajo[orden], np.quantile(monto, cuantil_pequeno),
+            ventana_horas=ventana_horas, minimo=minimo_racha,
+        ),
+    }
+
+
+class MotorIA:
+    """Carga los gastos una vez por instancia y calcula los puntajes en columnas."""
+
+    def __init__(self, db):
+        self.db = db
+        self._gastos = None
+
+    @property
+    def gastos(self):
+        if self._gastos is None:
+            self._gastos = cargar_gastos(self.db)
+        return self._gastos
+
+    @classmethod
+    def desde_instantanea(cls, directorio=None):
+        """Motor sobre la copia local en Parquet (ver `app.db.instantanea`), sin consultar la base."""
+        from app.db.instantanea import DIRECTORIO, leer_movimientos # pyarrow solo si se usa
+
+        motor = cls(None)
+        motor._gastos = _con_sin_categoria(leer_movimientos(directorio or DIRECTORIO, COLUMNAS, tipo="GASTO"))
+        return motor
+
+    def analizar(self, umbral: int = 5, **opciones):
+        """Categorías, arrepentimiento, gasto impulsivo y suscripciones.
+
+        Las suscripciones son las del estado guardado por `app.db.recurrencias`
+        (sin base, con la instantánea, la lista va vacía).
+        """
+        resultado = puntuar(self.gastos, umbral, **opciones)
+        resultado["suscripciones"] = listar_recurrencias(self.db, umbral=umbral) if self.db is not None else []
+        return resultado
@@ -0,0 +1,24 @@
+"""Clave normalizada de descripciones.
+
+Los bancos y los usuarios escriben el mismo gasto de muchas formas
+("Suscripción olvidada", "SUSCRIPCION OLVIDADA 0423", "suscripción  olvidada.").
+La clave los agrupa: minúsculas (casefold), sin acentos, sin puntuación y sin
+tokens puramente numéricos (referencias, números de operación).
+"""
+import re
+import unicodedata
+from functools import lru_cache
+
+LARGO_CLAVE = 255
+_PUNTUACION = re.compile(r"[^\w\s]")
+
+
+@lru_cache(maxsize=65536)
+def normalizar_descripcion(texto):
+    """'  Suscripción Olvidada #0423 ' -> 'suscripcion olvidada'."""
+    if not texto:
+        return ""
+    texto = unicodedata.normalize("NFKD", texto.casefold())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    texto = _PUNTUACION.sub(" ", texto)
+    return " ".join(t for t in texto.split() if not t.isdigit())[:LARGO_CLAVE]
@@ -0,0 +1,106 @@
+import numpy as np
+
+# Escenarios por defecto: recortar 0%, 25%, 50%, 75% y 100% del gasto ineficiente
+RECORTES_POR_DEFECTO = (0.0, 0.25, 0.5, 0.75, 1.0)
+
+
+def proyectar_metas(metas, ahorro_mensual, desperdicio_mensual=0.0, recortes=RECORTES_POR_DEFECTO,
+                    meses=120, tasa_interes_mensual=0.0, factores_ingreso=None,
+                    volatilidad_ingreso=0.0, semilla=None, devolver_saldos=False):
+    """Proyecta mes a mes el saldo de muchas metas y escenarios a la vez.
+
+    `metas` es una secuencia de `MetaAhorro` (o filas con `monto_objetivo` y
+    `monto_actual`). Cada mes el saldo crece con el interés y recibe
+    `ahorro_mensual * factor_ingreso + recorte * desperdicio_mensual`.
+
+    - `ahorro_mensual`: escalar o un valor por meta.
+    - `recortes`: fracciones 0-1 del gasto ineficiente que se recorta (un escenario por valor).
+    - `factores_ingreso`: multiplicador del ahorro por mes, forma (meses,) o (escenarios, meses).
+      Si no se indica y `volatilidad_ingreso > 0`, se generan al azar alrededor de 1.
+    - `devolver_saldos`: agrega `saldos` (escenarios, metas, meses); sin él no se
+      arma la trayectoria completa.
+
+    Devuelve arrays: `meses_alcance` (escenarios, metas; -1 si no se alcanza en
+    el horizonte) y `alcanzada`.
+    """
+    objetivos = np.fromiter((m.monto_objetivo for m in metas), dtype=np.float64)
+    actuales = np.fromiter((m.monto_actual or 0.0 for m in metas), dtype=np.float64)
+    ahorro = np.broadcast_to(np.asarray(ahorro_mensual, dtype=np.float64), objetivos.shape)
+    recortes = np.asarray(recortes, dtype=np.float64).reshape(-1)
+    if np.any((recortes < 0) | (recortes > 1)):
+        raise ValueError("Los recortes deben estar entre 0 y 1")
+
+    if factores_ingreso is None:
+        if volatilidad_ingreso > 0:
+            rng = np.random.default_rng(semilla)
+            factores_ingreso = np.clip(rng.normal(1.0, volatilidad_ingreso, (recortes.size, meses)), 0, None)
+        else:
+            factores_ingreso = np.ones(meses)
+    factores = np.asarray(factores_ingreso, dtype=np.float64)
+    if factores.ndim == 2 and factores.shape[0] != recortes.size:
+        raise ValueError(f"factores_ingreso debe tener una fila por escenario ({recortes.size})")
+    if factores.ndim not in (1, 2) or factores.shape[-1] != meses:
+        raise ValueError("factores_ingreso debe tener un valor por mes")
+    factores = np.atleast_2d(factores)
+
+    # Con interés compuesto, el saldo del mes t es lineal en cada aporte:
+    #   saldo_t = actual * c_t + ahorro * A_t + recorte * desperdicio * B_t
+    # donde c_t = (1 + r)^t y A_t, B_t acumulan los aportes capitalizados.
+    crecimiento = (1.0 + tasa_interes_mensual) ** np.arange(1, meses + 1)
+    acumulado_ingreso = crecimiento * np.cumsum(factores / crecimiento, axis=-1)  # (1|S, T)
+    acumulado_fijo = crecimiento * np.cumsum(1.0 / crecimiento)                   # (T,)
+    aporte_fijo = recortes * desperdicio_mensual
+
+    resultado = {"recortes": recortes, "objetivos": objetivos}
+    # Sin retiros (todo >= 0) el saldo no baja nunca y el primer mes que llega
+    # se busca por bisección: log2(meses) pasos sobre (escenarios, metas).
+    creciente = (
+        tasa_interes_mensual >= 0 and desperdicio_mensual >= 0
+        and not np.any(actuales < 0) and not np.any(ahorro < 0) and not np.any(factores < 0)
+    )
+    if devolver_saldos or not creciente:
+        saldos = (
+            actuales[None, :, None] * crecimiento
+            + ahorro[None, :, None] * acumulado_ingreso[:, None, :]
+            + aporte_fijo[:, None, None] * acumulado_fijo
+        )
+        llega = saldos >= objetivos[None, :, None]
+        alcanzada = llega.any(axis=-1)
+        meses_alcance = np.where(alcanzada, llega.argmax(axis=-1) + 1, -1)
+        if devolver_saldos:
+            resultado["saldos"] = saldos
+    else:
+        meses_alcance = _primer_mes(
+            actuales, ahorro, objetivos, aporte_fijo, crecimiento, acumulado_ingreso, acumulado_fijo,
+        )
+        alcanzada = meses_alcance > 0
+
+    # Las metas que ya están cubiertas no necesitan ningún mes más
+    meses_alcance[:, actuales >= objetivos] = 0
+    alcanzada |= actuales >= objetivos
+
+    resultado.update(meses_alcance=meses_alcance, alcanzada=alcanzada)
+    return resultado
+
+
+def _primer_mes(actuales, ahorro, objetivos, aporte_fijo, crecimiento, acumulado_ingreso, acumulado_fijo):
+    """Primer mes (1..T) con saldo >= objetivo, o -1; el saldo debe ser no decreciente."""
+    meses = crecimiento.size
+    forma = (aporte_fijo.size, objetivos.size)
+    filas = np.arange(acumulado_ingreso.shape[0])[:, None] # 0 si el ingreso es igual en todos
+    bajo = np.zeros(forma, dtype=np.intp)
+    alto = np.full(forma, meses, dtype=np.intp) # `meses` = no se alcanza
+    while True:
+        activo = bajo < alto
+        if not activo.any():
+            break
+        medio = np.minimum((bajo + alto) // 2, meses - 1)
+        saldo = (
+            actuales * crecimiento[medio]
+            + ahorro * acumulado_ingreso[filas, medio]
+            + aporte_fijo[:, None] * acumulado_fijo[medio]
+        )
+        llega = saldo >= objetivos
+        alto = np.where(activo & llega, medio, alto)
+        bajo = np.where(activo & ~llega, medio + 1, bajo)
+    return np.where(bajo < meses, bajo + 1, -1)
@@ -1,17 +1,16 @@
-import sys
-import os
-from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Index
+from sqlalchemy.orm import relationship, validates
 from datetime import datetime
 
-# Esto fuerza a Python a reconocer la carpeta raíz 'PRUEBA'
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from app.db.session import Base
+from app.ia.normalizacion import normalizar_descripcion
 
-try:
-    from app.db.session import Base
-except ModuleNotFoundError:
-    # Si falla la importación absoluta, intentamos una relativa o directa
-    from db.session import Base
+def _clave_por_defecto(contexto):
+    # Cubre también los INSERT de Core (ingesta masiva, importador)
+    return normalizar_descripcion(contexto.get_current_parameters().get("descripcion"))
+
+# Etiqueta de los movimientos sin categoría en gráficos, análisis y formularios
+SIN_CATEGORIA = "Sin Categoría"
 
 class Categoria(Base):
     __tablename__ = "categorias"
@@ -23,12 +22,26 @@ class Categoria(Base):
 
 class Movimiento(Base):
     __tablename__ = "movimientos"
+    __table_args__ = (
+        # Filtros por tipo acotados por fecha (totales, diagnóstico por ventana)
+        Index("ix_movimientos_tipo_fecha", "tipo", "fecha"),
+        # Orden del historial y paginación por clave (fecha, id)
+        Index("ix_movimientos_fecha_id", "fecha", "id"),
+        # Agrupar por descripción normalizada (detector de recurrentes, gráficos)
+        Index("ix_movimientos_clave_fecha", "clave_descripcion", "fecha"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     tipo = Column(String(10), nullable=False)
     descripcion = Column(String(255), nullable=False)
+    clave_descripcion = Column(String(255), default=_clave_por_defecto) # ver app.ia.normalizacion
     monto = Column(Float, nullable=False)
     fecha = Column(DateTime, default=datetime.utcnow)
 
     categoria_id = Column(Integer, ForeignKey("categorias.id"), nullable=True)
     categoria = relationship("Categoria", back_populates="movimientos")
-    satisfaccion = relationship("MetricaSatisfaccion", back_populates="movimiento", uselist=False)
\ No newline at end of file
+    satisfaccion = relationship("MetricaSatisfaccion", back_populates="movimiento", uselist=False)
+
+    @validates("descripcion")
+    def _actualizar_clave(self, _, descripcion):
+        self.clave_descripcion = normalizar_descripcion(descripcion)
+        return descripcion
\ No newline at end of file
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text
+from app.db.session import Base
+
+class Recurrencia(Base):
+    """Estado acumulado del detector de cargos recurrentes, uno por clave de descripción.
+
+    Guarda sumas (no filas) para que cada corrida solo procese movimientos nuevos:
+    de ellas salen el intervalo medio entre cargos, el monto medio y su dispersión.
+    """
+    __tablename__ = "recurrencias"
+
+    clave = Column(String(255), primary_key=True)
+    descripcion = Column(String(255), nullable=False) # Primera descripción vista, para mostrar
+    ocurrencias = Column(Integer, nullable=False, default=0)
+    ultima_fecha = Column(DateTime)
+    ultimo_monto = Column(Float)
+    suma_monto = Column(Float, nullable=False, default=0.0)
+    suma_monto2 = Column(Float, nullable=False, default=0.0)
+    intervalos = Column(Integer, nullable=False, default=0)
+    suma_dias = Column(Float, nullable=False, default=0.0)
+    suma_dias2 = Column(Float, nullable=False, default=0.0)
+    con_nivel = Column(Integer, nullable=False, default=0)
+    suma_nivel = Column(Integer, nullable=False, default=0)
+
+class MarcaProceso(Base):
+    """Último id de movimiento procesado por un proceso incremental."""
+    __tablename__ = "marcas_proceso"
+
+    nombre = Column(String(50), primary_key=True)
+    ultimo_id = Column(Integer, nullable=False, default=0)
+    # JSON [[desde, hasta], ...]: ids bajo la marca que aún no estaban confirmados
+    huecos = Column(Text)
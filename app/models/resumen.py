@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, Float, Date
+from app.db.session import Base
+
+# categoria_id de los movimientos sin categoría (la clave primaria no admite NULL)
+ID_SIN_CATEGORIA = 0
+
+class ResumenMensual(Base):
+    """Agregado por (mes, categoría, tipo, nivel de satisfacción).
+
+    `nivel` es el tramo de satisfacción: el nivel 1..10 de la métrica, o 0 si
+    el movimiento no tiene métrica. Se mantiene incrementalmente desde las rutas
+    de escritura (ver `app.db.resumen`).
+    """
+    __tablename__ = "resumen_mensual"
+
+    mes = Column(Date, primary_key=True) # Primer día del mes
+    categoria_id = Column(Integer, primary_key=True, default=ID_SIN_CATEGORIA)
+    tipo = Column(String(10), primary_key=True)
+    nivel = Column(Integer, primary_key=True)
+    suma = Column(Float, nullable=False, default=0.0)
+    cantidad = Column(Integer, nullable=False, default=0)
+    suma_nivel = Column(Integer, nullable=False, default=0)
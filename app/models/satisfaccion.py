@@ -1,9 +1,14 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.db.session import Base
 
 class MetricaSatisfaccion(Base):
     __tablename__ = "metricas_satisfaccion"
+    __table_args__ = (
+        # Una métrica por movimiento (la relación es uselist=False) y acceso por JOIN
+        Index("ix_metricas_movimiento_id", "movimiento_id", unique=True),
+        Index("ix_metricas_nivel", "nivel"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     movimiento_id = Column(Integer, ForeignKey("movimientos.id"))
     nivel = Column(Integer, nullable=False) # Nota: Tu IA busca .nivel, no .nivel_satisfaccion
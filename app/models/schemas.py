@@ -0,0 +1,32 @@
+from datetime import datetime
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field
+
+
+class MovimientoEntrada(BaseModel):
+    """Un movimiento con su métrica de satisfacción, tal como llega a la API."""
+    tipo: Literal["GASTO", "INGRESO"] = "GASTO"
+    descripcion: str = Field(min_length=1, max_length=255)
+    monto: float = Field(gt=0)
+    nivel_satisfaccion: int = Field(ge=1, le=10)
+    categoria: Optional[str] = Field(default=None, max_length=50)
+    comentario: Optional[str] = Field(default=None, max_length=255)
+    fecha: Optional[datetime] = None
+
+
+class ResultadoLote(BaseModel):
+    lote: int
+    insertados: int
+    ids: List[int] = []
+    error: Optional[str] = None
+
+
+class ErrorFila(BaseModel):
+    linea: int
+    error: str
+
+
+class ResultadoIngesta(BaseModel):
+    total_insertados: int
+    lotes: List[ResultadoLote]
+    errores: List[ErrorFila] = []
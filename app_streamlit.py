@@ -1,45 +1,29 @@
 import sys
 import os
 import time
+from datetime import datetime, timedelta
 import streamlit as st
 import streamlit.components.v1 as components
-import base64
 from streamlit_option_menu import option_menu
 import matplotlib.pyplot as plt
+from app.assets import obtener_carita
 from app.db.session import SessionLocal
+from app.db.cache import diagnosticos
+from app.db.categorias import invalidar_categorias, listar_categorias
+from app.db.ledger import cargar_ledger, registrar_escritura, version_ledger
+from app.db.ingesta import despues_de_confirmar, registrar_movimiento
+from app.db.historial import ORDENES, FilaHistorial, detectar_cambios, eliminar_movimientos, guardar_cambios, pagina_historial
+from app.db.queries import pagina_recientes, top_por_tipo
+from app.db.recurrencias import detectar_recurrencias
 from app.ia.analisis_psicometrico import MotorPsicometrico
-from app.models.movimiento import Movimiento, Categoria
-from app.models.satisfaccion import MetricaSatisfaccion
+from app.ia.graficos import MAX_PUNTOS, colores_por_clave, figura_burbujas_png, preparar_burbujas
+from app.ia.motor_ia import MotorIA
+from app.models.movimiento import SIN_CATEGORIA, Categoria
+from app.models.schemas import MovimientoEntrada
 
 if 'satisfaccion' not in st.session_state:
     st.session_state.satisfaccion = 10 # Empezamos en 10 por defecto
 
-def get_base64_image(image_path):
-    try:
-        with open(image_path, "rb") as img_file:
-            return f"data:image/png;base64,{base64.b64encode(img_file.read()).decode()}"
-    except: return ""
-
-# 1. Función de carga ultra-rápida con caché de objeto completo
-def get_base64_image(path):
-    with open(path, "rb") as img_file:
-        # El .decode('utf-8') es vital para que sea texto y no bytes
-        return base64.b64encode(img_file.read()).decode('utf-8')
-# --- FUNCIÓN AUXILIAR PARA CARGAR IMÁGENES LOCALES ---
-def get_base64_image(image_path):
-    try:
-        with open(image_path, "rb") as img_file:
-            return f"data:image/png;base64,{base64.b64encode(img_file.read()).decode()}"
-    except Exception:
-        return ""
-# Función para convertir tus caritas locales a formato que el navegador entienda
-def get_base64_image(image_path):
-    try:
-        with open(image_path, "rb") as img_file:
-            return f"data:image/png;base64,{base64.b64encode(img_file.read()).decode()}"
-    except Exception:
-        return ""
-    
 # Función para dibujar las barras de movimientos (Reutilizable)
 def renderizar_fila_movimiento(m, valor_max):
     es_ingreso = (m.tipo.upper() == "INGRESO")
@@ -106,12 +90,77 @@ with st.sidebar:
     )
     opcion = seleccion if seleccion else "Inicio"
 # --- LÓGICA DE DATOS GLOBAL ---
+# El ledger se lee una sola vez por versión; los reruns (p. ej. clics en las
+# caritas) reutilizan la caché hasta que una escritura cambia la versión.
+@st.cache_data(show_spinner=False, max_entries=4)
+def obtener_ledger(version):
+    db = SessionLocal()
+    try:
+        return cargar_ledger(db)
+    finally:
+        db.close()
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def obtener_pasteles(version):
+    """Porciones de los pasteles agregadas en la base (pocas filas por tipo)."""
+    db = SessionLocal()
+    try:
+        return {tipo: top_por_tipo(db, tipo) for tipo in ("INGRESO", "GASTO")}
+    finally:
+        db.close()
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def obtener_patrones(version):
+    db = SessionLocal()
+    try:
+        return MotorIA(db).analizar()
+    finally:
+        db.close()
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def obtener_recurrencias(version):
+    db = SessionLocal()
+    try:
+        recurrentes = detectar_recurrencias(db)
+        db.commit()
+        return recurrentes
+    finally:
+        db.close()
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def obtener_mapa_valor(version):
+    """PNG del Mapa de Valor y colores por clave; se rehace solo si cambia el ledger."""
+    db = SessionLocal()
+    try:
+        datos = MotorPsicometrico(db).columnas_burbujas(max_puntos=MAX_PUNTOS)
+    finally:
+        db.close()
+    burbujas = preparar_burbujas(datos)
+    if burbujas.empty:
+        return {"png": None, "colores": {}}
+    colores = colores_por_clave(burbujas["clave"]) # Solo las claves que se dibujan
+    return {"png": figura_burbujas_png(burbujas, colores), "colores": colores}
+
+MOVIMIENTOS_POR_PAGINA = 20
+FILAS_POR_PAGINA_HISTORIAL = 50
+
+def cargar_mas_inicio():
+    """Trae la siguiente página de actividad y la acumula en la sesión."""
+    extra = st.session_state.inicio_extra
+    db = SessionLocal()
+    try:
+        filas, extra["cursor"] = pagina_recientes(db, MOVIMIENTOS_POR_PAGINA, extra["cursor"])
+    finally:
+        db.close()
+    extra["filas"].extend(filas)
+
 db = SessionLocal()
-movimientos_db = db.query(Movimiento).all()
-total_gastos = sum(m.monto for m in movimientos_db if m.tipo == "GASTO")
-total_ingresos = sum(m.monto for m in movimientos_db if m.tipo == "INGRESO")
-saldo_final = total_ingresos - total_gastos
+version_actual = version_ledger(db)
 db.close()
+ledger = obtener_ledger(version_actual)
+total_gastos = ledger["total_gastos"]
+total_ingresos = ledger["total_ingresos"]
+saldo_final = ledger["saldo_final"]
 
 # --- NAVEGACIÓN ---
 
@@ -136,18 +185,24 @@ if opcion == "Inicio":
     st.divider()
     st.subheader("📊 Última Actividad (Impacto Proporcional)")
     
-    if not movimientos_db:
+    if not ledger["recientes"]:
         st.info("No hay registros aún.")
     else:
         # Configuración del estado de expansión
         if "mostrar_todo_inicio" not in st.session_state:
             st.session_state.mostrar_todo_inicio = False
+        # Páginas extra ya cargadas; se descartan si el ledger cambió de versión
+        extra = st.session_state.get("inicio_extra")
+        if extra is None or extra["version"] != version_actual:
+            extra = {"version": version_actual, "filas": [], "cursor": ledger["siguiente"]}
+            st.session_state.inicio_extra = extra
 
-        valor_maximo_global = max([m.monto for m in movimientos_db]) if movimientos_db else 1
-        todos_reversa = movimientos_db[::-1]
+        valor_maximo_global = ledger["valor_maximo"]
         
-        # Seleccionamos qué mostrar (5 o todos)
-        movimientos_a_mostrar = todos_reversa if st.session_state.mostrar_todo_inicio else todos_reversa[:5]
+        # Seleccionamos qué mostrar (5 o las páginas cargadas bajo demanda)
+        movimientos_a_mostrar = ledger["recientes"]
+        if st.session_state.mostrar_todo_inicio:
+            movimientos_a_mostrar = movimientos_a_mostrar + extra["filas"]
         
         # Renderizado de la lista (EL ÚNICO QUE DEBE QUEDAR)
         for m in movimientos_a_mostrar:
@@ -155,11 +210,17 @@ if opcion == "Inicio":
 
         # Botón dinámico al final
         st.write("")
-        if not st.session_state.mostrar_todo_inicio and len(todos_reversa) > 5:
+        if not st.session_state.mostrar_todo_inicio and ledger["siguiente"] is not None:
             if st.button("🔽 Mostrar todos los movimientos", use_container_width=True):
                 st.session_state.mostrar_todo_inicio = True
+                if not extra["filas"]:
+                    cargar_mas_inicio()
                 st.rerun()
         elif st.session_state.mostrar_todo_inicio:
+            if extra["cursor"] is not None:
+                if st.button("🔽 Cargar más movimientos", use_container_width=True):
+                    cargar_mas_inicio()
+                    st.rerun()
             if st.button("🔼 Mostrar menos", use_container_width=True):
                 st.session_state.mostrar_todo_inicio = False
                 st.rerun()
@@ -181,8 +242,8 @@ elif opcion == "Registrar Movimiento":
         tipo = st.selectbox("Tipo", ["GASTO", "INGRESO"], key="reg_tipo")
         
         # --- Lógica de Categorías Dinámicas ---
-        cats_disponibles = db.query(Categoria).filter(Categoria.tipo == tipo).all()
-        lista_nombres = ["Sin Categoría"] + [c.nombre for c in cats_disponibles]
+        cats_disponibles = listar_categorias(db, tipo) # En caché; no consulta en cada rerun
+        lista_nombres = [SIN_CATEGORIA] + [c.nombre for c in cats_disponibles]
         cat_elegida = st.selectbox("Categoría", lista_nombres)
         # --------------------------------------
         
@@ -242,9 +303,7 @@ elif opcion == "Registrar Movimiento":
 
             with grids[i-1]:
 
-                img_path = f"assets/caritas/carita{i}.PNG"
-
-                img_base64 = get_base64_image(img_path)
+                img_base64 = obtener_carita(i)
 
                
 
@@ -277,28 +336,18 @@ elif opcion == "Registrar Movimiento":
     if st.button("🚀 Guardar Registro", use_container_width=True, type="primary"):
         if descripcion and monto > 0:
             try:
-                # Obtener ID de categoría
-                id_cat = None
-                if cat_elegida != "Sin Categoría":
-                    c_obj = db.query(Categoria).filter(Categoria.nombre == cat_elegida).first()
-                    id_cat = c_obj.id
-
-                nuevo_mov = Movimiento(
-                    tipo=tipo, 
-                    descripcion=descripcion, 
-                    monto=monto, 
-                    categoria_id=id_cat
+                # Mismo servicio que la API: movimiento, métrica y resumen en una transacción
+                nuevo = MovimientoEntrada(
+                    tipo=tipo,
+                    descripcion=descripcion,
+                    monto=monto,
+                    nivel_satisfaccion=st.session_state.satisfaccion,
+                    categoria=None if cat_elegida == SIN_CATEGORIA else cat_elegida,
+                    comentario=comentario or None,
                 )
-                db.add(nuevo_mov)
-                db.flush() 
-                
-                nueva_metrica = MetricaSatisfaccion(
-                    movimiento_id=nuevo_mov.id, 
-                    nivel=st.session_state.satisfaccion, 
-                    comentario=comentario
-                )
-                db.add(nueva_metrica)
+                registrar_movimiento(db, nuevo)
                 db.commit()
+                despues_de_confirmar(db)
                 
                 st.balloons()
                 st.success(f"✅ ¡Registro guardado en {cat_elegida}!")
@@ -330,6 +379,7 @@ elif opcion == "Categorías":
                     nueva = Categoria(nombre=nombre_cat.strip().title(), tipo=tipo_cat)
                     db.add(nueva)
                     db.commit()
+                    invalidar_categorias()
                     st.success(f"✅ Categoría '{nombre_cat}' creada correctamente.")
                     st.rerun()
                 except Exception as e:
@@ -340,7 +390,7 @@ elif opcion == "Categorías":
 
     with col2:
         st.subheader("📑 Categorías Existentes")
-        categorias = db.query(Categoria).all()
+        categorias = listar_categorias(db)
         if not categorias:
             st.info("No hay categorías registradas.")
         else:
@@ -389,17 +439,13 @@ elif opcion == "Visualizaciones":
 
     st.title("Análisis de Datos")
 
-    db = SessionLocal()
-
-    motor = MotorPsicometrico(db)
-
-    datos_burbujas = motor.preparar_datos_burbujas()
+    mapa_valor = obtener_mapa_valor(version_actual)
 
-    db.close()
+    pasteles = obtener_pasteles(version_actual)
 
 
 
-    if not movimientos_db:
+    if not (pasteles["INGRESO"] or pasteles["GASTO"]):
 
         st.warning("Sin datos suficientes.")
 
@@ -407,11 +453,7 @@ elif opcion == "Visualizaciones":
 
         # --- CONFIGURACIÓN DE COLORES SINCRONIZADOS ---
 
-        descripciones_unicas = list(set(d['descripcion'] for d in datos_burbujas))
-
-        color_palette = plt.get_cmap("tab20")
-
-        color_map = {desc: color_palette(i / len(descripciones_unicas)) for i, desc in enumerate(descripciones_unicas)}
+        color_map = mapa_valor["colores"] # Por clave de descripción, igual que en el Mapa de Valor
 
 
 
@@ -419,17 +461,10 @@ elif opcion == "Visualizaciones":
 
        
 
-        def dibujar_pastel(ax, datos_lista, titulo, es_gasto=False):
-
-            resumen = {}
-
-            for d in datos_lista:
-
-                resumen[d.descripcion] = resumen.get(d.descripcion, 0) + d.monto
-
-           
+        def dibujar_pastel(ax, porciones, titulo, es_gasto=False):
 
-            if not resumen:
+            # Porciones ya agrupadas en la base (top por descripción normalizada + "Otros")
+            if not porciones:
 
                 ax.text(0.5, 0.5, "Sin datos", ha='center')
 
@@ -439,13 +474,13 @@ elif opcion == "Visualizaciones":
 
            
 
-            labels, sizes = list(resumen.keys()), list(resumen.values())
+            labels, sizes = [p["etiqueta"] for p in porciones], [p["monto"] for p in porciones]
 
            
 
             if es_gasto:
 
-                colores = [color_map.get(label, "#cccccc") for label in labels]
+                colores = [color_map.get(p["clave"], "#cccccc") for p in porciones]
 
             else:
 
@@ -509,7 +544,7 @@ elif opcion == "Visualizaciones":
 
             fig_ing, ax_ing = plt.subplots()
 
-            dibujar_pastel(ax_ing, [m for m in movimientos_db if m.tipo=="INGRESO"], "Ingresos")
+            dibujar_pastel(ax_ing, pasteles["INGRESO"], "Ingresos")
 
             st.pyplot(fig_ing)
 
@@ -519,7 +554,7 @@ elif opcion == "Visualizaciones":
 
             fig_gas, ax_gas = plt.subplots()
 
-            dibujar_pastel(ax_gas, [m for m in movimientos_db if m.tipo=="GASTO"], "Gastos", es_gasto=True)
+            dibujar_pastel(ax_gas, pasteles["GASTO"], "Gastos", es_gasto=True)
 
             st.pyplot(fig_gas)
 
@@ -531,41 +566,29 @@ elif opcion == "Visualizaciones":
 
        
 
-        if datos_burbujas:
-
-            fig_b, ax_b = plt.subplots(figsize=(10, 5))
-
-            for d in datos_burbujas:
-
-                c_burbuja = color_map.get(d['descripcion'], "blue")
-
-                ax_b.scatter(d['monto'], d['satisfaccion'], s=d['peso']*15, alpha=0.7, color=c_burbuja, edgecolors="white")
-
-                ax_b.annotate(f" {d['descripcion']}", (d['monto'], d['satisfaccion']), fontsize=9, fontweight='bold')
-
-           
+        if mapa_valor["png"]:
 
-            ax_b.set_xlabel("Monto Invertido ($)")
-
-            ax_b.set_ylabel("Nivel de Satisfacción")
-
-            ax_b.grid(True, linestyle='--', alpha=0.5)
-
-            st.pyplot(fig_b)
+            st.image(mapa_valor["png"], use_container_width=True)
 
             
 elif opcion == "Recomendaciones":
     st.title("🤖 Recomendaciones") # Título actualizado
     db = SessionLocal()
     motor = MotorPsicometrico(db)
-    analisis = motor.calcular_costo_insatisfaccion()
+    analisis = diagnosticos.obtener((5, None, None), motor.calcular_costo_insatisfaccion)
     
     if analisis["total_ineficiente"] > 0:
         st.error(f"⚠️ He detectado {analisis['cantidad_gastos']} gasto(s) ineficientes.")
         for detalle in analisis["detalles"]:
             st.warning(f"👉 **{detalle['desc']}**: ${detalle['monto']} (Nivel: {detalle['nivel']}/10)")
         
-        st.info(f"Si eliminas estos gastos, podrías recuperar **${analisis['total_ineficiente']}** mensuales.")
+        ventanas = motor.calcular_ventanas()
+        col_30, col_90, col_365 = st.columns(3)
+        col_30.metric("Últimos 30 días", f"${ventanas[30]['total']:,.2f}")
+        col_90.metric("Últimos 90 días", f"${ventanas[90]['total']:,.2f}")
+        col_365.metric("Último año", f"${ventanas[365]['total']:,.2f}")
+
+        st.info(f"Si eliminas estos gastos, podrías recuperar **${motor.promedio_mensual():,.2f}** mensuales en promedio.")
         
         # Simulación de meta (puedes ajustar los valores)
         simulacion = motor.simular_alcance_meta(monto_meta=1000, ahorro_mensual_base=100)
@@ -577,6 +600,33 @@ elif opcion == "Recomendaciones":
     
     db.close()
 
+    # --- PATRONES DE GASTO (motor_ia) ---
+    patrones = obtener_patrones(version_actual)
+    if patrones["movimientos"]:
+        st.divider()
+        st.subheader("🔎 Patrones de gasto")
+        col_arr, col_imp = st.columns(2)
+        col_arr.metric("Arrepentimiento", f"{patrones['arrepentimiento']:.0%}",
+                       help="Parte del gasto total con satisfacción baja")
+        col_imp.metric("Gasto impulsivo", f"${patrones['impulsivos']['total']:,.2f}",
+                       f"{patrones['impulsivos']['cantidad']} gastos", delta_color="off")
+
+        st.markdown("**Costo por punto de satisfacción**")
+        st.dataframe(patrones["categorias"], hide_index=True, use_container_width=True)
+
+    recurrentes = obtener_recurrencias(version_actual)
+    if recurrentes:
+        st.markdown("**Suscripciones detectadas**")
+        for s in recurrentes:
+            estado = "activa" if s["activa"] else "sin cobros recientes"
+            nivel = f"satisfacción {s['nivel_promedio']}/10" if s["nivel_promedio"] is not None else "sin satisfacción"
+            texto = (f"🔁 **{s['descripcion']}** ({s['periodo']}, {estado}): ${s['monto']} "
+                     f"→ ${s['costo_anual']:,.2f} al año · {nivel}")
+            if s["insatisfactoria"]:
+                st.warning(texto + " — ¿la sigues usando?")
+            else:
+                st.write(texto)
+
 elif opcion == "Gestionar Historial":
     st.title("Gestión de Historial")
     db = SessionLocal()
@@ -587,24 +637,54 @@ elif opcion == "Gestionar Historial":
     if "modo_edicion" not in st.session_state:
         st.session_state.modo_edicion = False
 
-    # 1. Obtener datos
-    historial = db.query(Movimiento).join(MetricaSatisfaccion).order_by(Movimiento.fecha.desc()).all()
-    
+    # 1. Filtros y orden: se aplican en la base y solo se trae la página visible
+    with st.expander("🔎 Filtros y orden"):
+        fil_fecha, fil_tipo, fil_cat = st.columns(3)
+        rango = fil_fecha.date_input("Rango de fechas", value=[], key="hist_rango")
+        tipo_filtro = fil_tipo.selectbox("Tipo", ["Todos", "GASTO", "INGRESO"], key="hist_tipo")
+        categorias_filtro = listar_categorias(db)
+        cat_filtro = fil_cat.selectbox(
+            "Categoría", [None, *categorias_filtro], key="hist_categoria",
+            format_func=lambda c: "Todas" if c is None else c.nombre,
+        )
+        fil_nivel, fil_texto, fil_orden = st.columns(3)
+        nivel_filtro = fil_nivel.slider("Satisfacción", 1, 10, (1, 10), key="hist_nivel")
+        texto_filtro = fil_texto.text_input("Buscar en la descripción", key="hist_texto")
+        orden = fil_orden.selectbox("Ordenar por", list(ORDENES), format_func=str.capitalize, key="hist_orden")
+        descendente = fil_orden.toggle("Descendente", value=True, key="hist_desc")
+
+    filtros = {
+        "desde": datetime.combine(rango[0], datetime.min.time()) if len(rango) > 0 else None,
+        "hasta": datetime.combine(rango[1] + timedelta(days=1), datetime.min.time()) if len(rango) > 1 else None,
+        "tipo": None if tipo_filtro == "Todos" else tipo_filtro,
+        "categoria_id": cat_filtro.id if cat_filtro is not None else None,
+        "nivel_min": nivel_filtro[0] if nivel_filtro[0] > 1 else None,
+        "nivel_max": nivel_filtro[1] if nivel_filtro[1] < 10 else None,
+        "texto": texto_filtro.strip() or None,
+    }
+    # Pila de cursores (uno por página visitada); se reinicia si cambia la consulta
+    consulta_actual = (tuple(filtros.values()), orden, descendente)
+    if st.session_state.get("hist_consulta") != consulta_actual:
+        st.session_state.hist_consulta = consulta_actual
+        st.session_state.hist_cursores = [None]
+    cursores = st.session_state.hist_cursores
+    historial, siguiente = pagina_historial(
+        db, FILAS_POR_PAGINA_HISTORIAL, cursores[-1], orden, descendente, **filtros
+    )
+
     if not historial:
-        st.info("Aún no tienes movimientos registrados.")
+        if any(v is not None for v in filtros.values()) or len(cursores) > 1:
+            st.info("Ningún movimiento coincide con los filtros.")
+        else:
+            st.info("Aún no tienes movimientos registrados.")
     else:
         import pandas as pd
-        datos_lista = []
-        for h in historial:
-            datos_lista.append({
-                "ID": h.id,
-                "Fecha": h.fecha.strftime("%Y-%m-%d"),
-                "Descripción": h.descripcion,
-                "Monto": h.monto,
-                "Tipo": h.tipo,
-                "Satisfacción": h.satisfaccion.nivel if hasattr(h.satisfaccion, 'nivel') else h.satisfaccion.level
-            })
-        df_historial = pd.DataFrame(datos_lista)
+        df_historial = pd.DataFrame(historial, columns=FilaHistorial._fields)
+        df_historial["fecha"] = pd.to_datetime(df_historial["fecha"]).dt.strftime("%Y-%m-%d")
+        df_historial = df_historial.rename(columns={
+            "id": "ID", "fecha": "Fecha", "descripcion": "Descripción", "monto": "Monto", "tipo": "Tipo",
+            "nivel": "Satisfacción",
+        })[["ID", "Fecha", "Descripción", "Monto", "Tipo", "Satisfacción"]]
 
         # 2. Botonera de control
         col_tit, col_edit, col_del = st.columns([2, 1, 1])
@@ -625,6 +705,18 @@ elif opcion == "Gestionar Historial":
                     st.session_state.modo_borrado = not st.session_state.modo_borrado
                     st.rerun()
 
+        nav_ant, nav_info, nav_sig = st.columns([1, 2, 1])
+        with nav_ant:
+            if st.button("⬅️ Anterior", disabled=len(cursores) == 1, use_container_width=True):
+                cursores.pop()
+                st.rerun()
+        with nav_info:
+            st.caption(f"Página {len(cursores)} · {len(historial)} registro(s)")
+        with nav_sig:
+            if st.button("Siguiente ➡️", disabled=siguiente is None, use_container_width=True):
+                cursores.append(siguiente)
+                st.rerun()
+
         # --- LÓGICA DE EDICIÓN ---
         if st.session_state.modo_edicion:
             st.info("💡 Haz doble clic en una celda para modificarla. Al terminar, presiona el botón 'Guardar Cambios'.")
@@ -646,26 +738,13 @@ elif opcion == "Gestionar Historial":
             # Detectar si hay cambios comparando DataFrames
             if st.button("💾 Guardar Cambios en Base de Datos", type="primary"):
                 try:
-                    cambios_realizados = False
-                    for index, row in df_editado.iterrows():
-                        original = df_historial.iloc[index]
-                        # Si la fila actual es distinta a la original, actualizamos
-                        if not row.equals(original):
-                            # Actualizar Movimiento
-                            mov = db.query(Movimiento).filter(Movimiento.id == int(row["ID"])).first()
-                            mov.descripcion = row["Descripción"]
-                            mov.monto = float(row["Monto"])
-                            mov.tipo = row["Tipo"]
-                            
-                            # Actualizar Satisfacción
-                            metrica = db.query(MetricaSatisfaccion).filter(MetricaSatisfaccion.movimiento_id == mov.id).first()
-                            metrica.nivel = int(row["Satisfacción"])
-                            
-                            cambios_realizados = True
+                    cambios = detectar_cambios(df_historial, df_editado)
                     
-                    if cambios_realizados:
+                    if not cambios.empty:
+                        filas_actualizadas = guardar_cambios(db, cambios)
                         db.commit()
-                        st.success("✅ Cambios guardados correctamente.")
+                        registrar_escritura()
+                        st.success(f"✅ {filas_actualizadas} registro(s) actualizado(s) correctamente.")
                         st.session_state.modo_edicion = False
                         st.rerun()
                     else:
@@ -688,9 +767,9 @@ elif opcion == "Gestionar Historial":
             if ids_a_eliminar:
                 if st.button(f"🗑️ Confirmar eliminación de {len(ids_a_eliminar)} registros"):
                     try:
-                        db.query(MetricaSatisfaccion).filter(MetricaSatisfaccion.movimiento_id.in_(ids_a_eliminar)).delete(synchronize_session=False)
-                        db.query(Movimiento).filter(Movimiento.id.in_(ids_a_eliminar)).delete(synchronize_session=False)
+                        eliminar_movimientos(db, ids_a_eliminar)
                         db.commit()
+                        registrar_escritura()
                         st.session_state.modo_borrado = False
                         st.success("Registros eliminados.")
                         st.rerun()
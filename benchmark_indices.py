@@ -0,0 +1,118 @@
+"""Compara planes de consulta y tiempos antes y después de crear los índices.
+
+    python benchmark_indices.py                      # SQLite en memoria, 200k movimientos
+    python benchmark_indices.py --filas 50000 --url postgresql://...  (base de pruebas, se vacía)
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert, select
+from app.db.migraciones import crear_indices
+from app.db.session import Base, crear_engine
+from app.models.movimiento import Movimiento
+from app.models.satisfaccion import MetricaSatisfaccion
+
+DESCRIPCIONES = ["Supermercado", "Cafe", "Suscripcion", "Gasolina", "Cine", "Sueldo", "Renta", "Delivery"]
+
+
+def poblar(engine, filas):
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    # Estado "antes": sin ninguno de los índices declarados en los modelos
+    with engine.begin() as conn:
+        for tabla in Base.metadata.sorted_tables:
+            for indice in tabla.indexes:
+                indice.drop(conn)
+
+    rnd = random.Random(42)
+    inicio = datetime(2022, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(Movimiento.__table__), [
+            {
+                "id": i,
+                "tipo": "INGRESO" if rnd.random() < 0.1 else "GASTO",
+                "descripcion": rnd.choice(DESCRIPCIONES),
+                "monto": round(rnd.uniform(1, 500), 2),
+                "fecha": inicio + timedelta(minutes=rnd.randrange(3 * 365 * 24 * 60)),
+            }
+            for i in range(1, filas + 1)
+        ])
+        conn.execute(insert(MetricaSatisfaccion.__table__), [
+            {"movimiento_id": i, "nivel": rnd.randint(1, 10)} for i in range(1, filas + 1)
+        ])
+
+
+def consultas_calientes():
+    """Las consultas que hoy recorren la tabla completa."""
+    hace_30_dias = datetime(2024, 12, 1)
+    return {
+        "diagnóstico (nivel < 2)": (
+            select(Movimiento.descripcion, Movimiento.monto, MetricaSatisfaccion.nivel)
+            .join(MetricaSatisfaccion, MetricaSatisfaccion.movimiento_id == Movimiento.id)
+            .where(MetricaSatisfaccion.nivel < 2)
+        ),
+        "historial (página por fecha)": (
+            select(Movimiento.id, Movimiento.fecha, Movimiento.monto)
+            .order_by(Movimiento.fecha.desc(), Movimiento.id.desc())
+            .limit(50)
+        ),
+        "gastos de los últimos 30 días": (
+            select(func.sum(Movimiento.monto))
+            .where(Movimiento.tipo == "GASTO", Movimiento.fecha >= hace_30_dias)
+        ),
+        "métrica de un movimiento": (
+            select(MetricaSatisfaccion.nivel).where(MetricaSatisfaccion.movimiento_id == 12345)
+        ),
+    }
+
+
+def explicar(conn, consulta):
+    sql = str(consulta.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    if conn.dialect.name == "sqlite":
+        return [fila[-1] for fila in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql)]
+    return [fila[0] for fila in conn.exec_driver_sql("EXPLAIN " + sql)]
+
+
+def medir(engine, repeticiones):
+    resultados = {}
+    with engine.connect() as conn:
+        for nombre, consulta in consultas_calientes().items():
+            plan = explicar(conn, consulta)
+            t0 = time.perf_counter()
+            for _ in range(repeticiones):
+                conn.execute(consulta).all()
+            resultados[nombre] = (plan, (time.perf_counter() - t0) / repeticiones * 1000)
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="sqlite://")
+    parser.add_argument("--filas", type=int, default=200_000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = crear_engine(args.url)
+    print(f"Poblando {args.filas} movimientos en {engine.dialect.name}...")
+    poblar(engine, args.filas)
+
+    antes = medir(engine, args.repeticiones)
+    creados, omitidos = crear_indices(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    despues = medir(engine, args.repeticiones)
+
+    print(f"Índices creados: {', '.join(creados)}")
+    for nombre, motivo in omitidos:
+        print(f"⚠️ {nombre} omitido: {motivo}.")
+    print()
+    for nombre in antes:
+        (plan_a, ms_a), (plan_d, ms_d) = antes[nombre], despues[nombre]
+        print(f"=== {nombre}: {ms_a:.2f} ms -> {ms_d:.2f} ms")
+        print("  antes:   " + "\n           ".join(plan_a))
+        print("  después: " + "\n           ".join(plan_d))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Mide el motor de patrones (`app.ia.motor_ia`) sobre gastos sintéticos.
+
+    python benchmark_motor_ia.py --filas 1000000
+    python benchmark_motor_ia.py --filas 200000 --url sqlite:///bench.db   (incluye la carga desde la base)
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from app.ia.motor_ia import COLUMNAS, MotorIA, puntuar
+
+SUSCRIPCIONES = {"Netflix": 15.99, "Spotify": 9.99, "Gimnasio": 35.0, "Seguro auto": 420.0}
+DESCRIPCIONES = ["Supermercado", "Cafe", "Gasolina", "Cine", "Delivery", "Farmacia", "Ropa", "Snack"]
+CATEGORIAS = ["Comida", "Ocio", "Transporte", "Salud", None]
+
+
+def generar(filas, semilla=42):
+    """DataFrame con la forma de `cargar_gastos`: gastos al azar más suscripciones mensuales."""
+    rnd = np.random.default_rng(semilla)
+    inicio = np.datetime64("2020-01-01T00:00:00")
+    segundos = rnd.integers(0, 5 * 365 * 86400, filas)
+    gastos = pd.DataFrame({
+        "fecha": inicio + segundos.astype("timedelta64[s]"),
+        "descripcion": np.array(DESCRIPCIONES)[rnd.integers(0, len(DESCRIPCIONES), filas)],
+        "monto": np.maximum(np.round(rnd.gamma(2.0, 20.0, filas), 2), 0.01),
+        "categoria": np.array(CATEGORIAS, dtype=object)[rnd.integers(0, len(CATEGORIAS), filas)],
+        "nivel": rnd.integers(1, 11, filas),
+    })
+    meses = pd.date_range("2020-01-05", "2024-12-05", freq="MS") + pd.Timedelta(days=4)
+    fijos = pd.DataFrame([
+        {"fecha": fecha, "descripcion": desc, "monto": monto, "categoria": "Suscripciones", "nivel": 3}
+        for desc, monto in SUSCRIPCIONES.items() for fecha in meses
+    ])
+    return pd.concat([gastos, fijos], ignore_index=True)[COLUMNAS]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    parser.add_argument("--url", help="si se indica, se cargan los gastos en esa base y se mide también la lectura")
+    args = parser.parse_args()
+
+    gastos = generar(args.filas)
+    if args.url:
+        from sqlalchemy.orm import Session
+        from app.db.ingesta import insertar_lote
+        from app.db.migraciones import sincronizar_esquema
+        from app.db.session import crear_engine
+        from app.models.schemas import MovimientoEntrada
+
+        engine = crear_engine(args.url)
+        sincronizar_esquema(engine)
+        with Session(engine) as db:
+            for i in range(0, len(gastos), 10_000):
+                insertar_lote(db, [
+                    MovimientoEntrada(descripcion=d, monto=m, nivel_satisfaccion=n,
+                                      categoria=c if isinstance(c, str) else None, fecha=f)
+                    for f, d, m, c, n in gastos.iloc[i:i + 10_000].itertuples(index=False)
+                ])
+            db.commit()
+            t0 = time.perf_counter()
+            gastos = MotorIA(db).gastos
+            print(f"Carga desde la base: {time.perf_counter() - t0:.2f} s")
+
+    t0 = time.perf_counter()
+    resultado = puntuar(gastos)
+    print(f"Puntajes sobre {resultado['movimientos']:,} gastos: {time.perf_counter() - t0:.2f} s")
+    print(f"Arrepentimiento: {resultado['arrepentimiento']:.1%}")
+    print(f"Impulsivo: ${resultado['impulsivos']['total']:,.2f} en {resultado['impulsivos']['cantidad']} gastos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import argparse
+from app.db.instantanea import DIRECTORIO, sincronizar_instantanea
+from app.db.session import SessionLocal
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Sincroniza la copia local del ledger en Parquet (particionada por mes). "
+                    "Después, con INSTANTANEA_DIR definida, los scripts de análisis la leen en lugar de la base."
+    )
+    parser.add_argument("--dir", default=DIRECTORIO, help=f"Directorio de la copia (por defecto: {DIRECTORIO})")
+    parser.add_argument("--completo", action="store_true", help="Rehace la copia desde cero")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        resultado = sincronizar_instantanea(db, args.dir, completo=args.completo)
+    except Exception as e:
+        print(f"❌ Error al sincronizar: {e}")
+        return
+    finally:
+        db.close()
+
+    print(f"✅ Copia en {args.dir}: {resultado['nuevos']} movimientos nuevos, "
+          f"{len(resultado['meses_reescritos'])} mes(es) reescritos, hasta el id {resultado['ultimo_id']}.")
+
+if __name__ == "__main__":
+    main()
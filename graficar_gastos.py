@@ -1,27 +1,23 @@
 ﻿import matplotlib.pyplot as plt
 from app.db.session import SessionLocal
 from app.ia.analisis_psicometrico import MotorPsicometrico
+from app.ia.graficos import MAX_PUNTOS, dibujar_burbujas, preparar_burbujas
 
 def generar_grafico():
     db = SessionLocal()
     motor = MotorPsicometrico(db)
-    datos = motor.preparar_datos_burbujas()
+    # Arreglos de una sola consulta; con muchos gastos llegan agrupados por descripción
+    datos = motor.columnas_burbujas(max_puntos=MAX_PUNTOS)
     db.close()
 
-    if not datos:
+    # Un solo scatter; con muchos gastos se agrupa por descripción y solo se etiquetan las mayores
+    burbujas = preparar_burbujas(datos)
+    if burbujas.empty:
         print('No hay datos suficientes para graficar.')
         return
 
-    descripciones = [d['descripcion'] for d in datos]
-    montos = [d['monto'] for d in datos]
-    satisfacciones = [d['satisfaccion'] for d in datos]
-    tamanos = [d['peso'] * 15 for d in datos] 
-
     plt.figure(figsize=(10, 6))
-    scatter = plt.scatter(montos, satisfacciones, s=tamanos, alpha=0.5, c=satisfacciones, cmap='RdYlGn')
-    
-    for i, txt in enumerate(descripciones):
-        plt.annotate(txt, (montos[i], satisfacciones[i]), fontsize=9, ha='right')
+    scatter = dibujar_burbujas(plt.gca(), burbujas)
 
     plt.axhline(y=5, color='gray', linestyle='--', alpha=0.3)
     plt.title('Mapa de Valor: Monto vs. Satisfaccion', fontsize=14)
@@ -32,7 +28,7 @@ def generar_grafico():
 
     print('Generando grafico... revisa tu barra de tareas.')
     print('📊 Generando gráfico...')
-    plt.savefig('reporte_psicometrico.png', dpi=300) # Guarda la imagen en alta calidad
+    plt.savefig('reporte_psicometrico.png', dpi=150) # Suficiente para pantalla e impresión, con 4x menos píxeles que 300
     print('✅ Imagen guardada como: reporte_psicometrico.png')
     plt.show()
 
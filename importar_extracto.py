@@ -0,0 +1,46 @@
+import argparse
+from app.db.session import SessionLocal
+from app.db.importador import importar
+from app.db.ingesta import TAMANO_LOTE, TAMANO_LOTE_MAXIMO
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa un extracto bancario CSV u OFX.")
+    parser.add_argument("archivo")
+    parser.add_argument("--formato", choices=["csv", "ofx"], help="Por defecto se deduce de la extensión")
+    parser.add_argument("--lote", type=int, default=TAMANO_LOTE, help="Filas por commit")
+    parser.add_argument("--checkpoint", help="Archivo JSON para retomar la importación si se corta")
+    parser.add_argument("--col", action="append", default=[], metavar="CAMPO=COLUMNA",
+                        help="Mapea un campo (fecha, descripcion, monto, tipo, categoria, comentario, "
+                             "nivel_satisfaccion) a una columna del CSV")
+    parser.add_argument("--delimitador", default=",")
+    parser.add_argument("--decimal", default=".", choices=[".", ","])
+    args = parser.parse_args()
+    if not 1 <= args.lote <= TAMANO_LOTE_MAXIMO:
+        parser.error(f"--lote debe estar entre 1 y {TAMANO_LOTE_MAXIMO}")
+
+    mapeo = dict(par.split("=", 1) for par in args.col)
+
+    def progreso(estado):
+        print(f"⏳ Filas {estado['filas_confirmadas']}: {estado['insertados']} insertadas, "
+              f"{estado['duplicados']} duplicadas, {estado['invalidos']} inválidas")
+
+    db = SessionLocal()
+    try:
+        estado = importar(db, args.archivo, formato=args.formato, mapeo=mapeo, tamano_lote=args.lote,
+                          checkpoint=args.checkpoint, separador_decimal=args.decimal,
+                          delimitador=args.delimitador, al_confirmar=progreso)
+    except Exception as e:
+        print(f"❌ Error al importar: {e}")
+        if args.checkpoint:
+            print(f"Puedes retomar con --checkpoint {args.checkpoint}")
+        return
+    finally:
+        db.close()
+
+    print(f"✅ Importación terminada: {estado['insertados']} movimientos nuevos, "
+          f"{estado['duplicados']} duplicados omitidos, {estado['invalidos']} filas inválidas.")
+    for error in estado["errores"][:10]:
+        print(f"   Fila {error['fila']}: {error['error']}")
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,34 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Literal, Optional
+from datetime import datetime
+from contextlib import asynccontextmanager
+import os
 
-from app.db.session import SessionLocal, engine, Base
-from app.models.movimiento import Movimiento
-from app.models.satisfaccion import MetricaSatisfaccion
-from app.ia.analisis_psicometrico import MotorPsicometrico
+from app.db.session import SessionLocal, obtener_engine
+from app.db.session_async import AsyncSessionLocal, cerrar_engine_async
+from app.db import cache
+from app.db.historial import LIMITE_MAXIMO, LIMITE_PAGINA, codificar_cursor, decodificar_cursor, pagina_historial
+from app.db.queries import TOP_PORCIONES, TOP_PORCIONES_MAXIMO, top_por_tipo
+from app.db.recurrencias import detectar_recurrencias, listar_recurrencias
+from app.db.migraciones import sincronizar_esquema
+from app.models.schemas import MovimientoEntrada, ResultadoIngesta
+from app.ia.analisis_psicometrico import MotorPsicometricoAsync
+from app.db.ingesta import TAMANO_LOTE, TAMANO_LOTE_MAXIMO, despues_de_confirmar, ingerir, procesar_lote, registrar_movimiento
 
-# Crear las tablas al iniciar la plataforma
-Base.metadata.create_all(bind=engine)
+# El esquema se sincroniza aparte (python -m app.db.migraciones). Solo si se pide
+# con DB_SINCRONIZAR_ESQUEMA=1 se hace al arrancar, nunca al importar el módulo.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if os.getenv("DB_SINCRONIZAR_ESQUEMA", "").lower() in ("1", "true"):
+        sincronizar_esquema(obtener_engine())
+    yield
+    await cerrar_engine_async()
 
-app = FastAPI(title="Plataforma de Finanzas con IA")
+app = FastAPI(title="Plataforma de Finanzas con IA", lifespan=lifespan)
 
 # Dependencia de base de datos
 def get_db():
@@ -20,32 +38,166 @@ def get_db():
     finally:
         db.close()
 
+# Dependencia asíncrona: los handlers async esperan a la base sin ocupar un hilo
+async def get_db_async():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 @app.get("/")
 def home():
     return {"status": "Online", "plataforma": "Gestor Financiero Psicometrico"}
 
+async def _registrar(db, movimiento):
+    """Movimiento + métrica + resumen en una sola transacción (ver `registrar_movimiento`)."""
+    id_ = await db.run_sync(registrar_movimiento, movimiento)
+    await db.commit()
+    await db.run_sync(despues_de_confirmar)
+    return id_
+
 # INTERFAZ PARA INGRESAR DATOS (POST)
 @app.post("/ingresar-gasto/")
-def crear_gasto(descripcion: str, monto: float, nivel_satisfaccion: int, db: Session = Depends(get_db)):
+async def crear_gasto(descripcion: str, monto: float, nivel_satisfaccion: int,
+                      tipo: Literal["GASTO", "INGRESO"] = "GASTO", categoria: Optional[str] = None,
+                      comentario: Optional[str] = None, db: AsyncSession = Depends(get_db_async)):
     if nivel_satisfaccion < 1 or nivel_satisfaccion > 10:
         raise HTTPException(status_code=400, detail="La satisfaccion debe ser entre 1 y 10")
-    
-    # 1. Crear el movimiento
-    nuevo_movimiento = Movimiento(tipo="GASTO", descripcion=descripcion, monto=monto)
-    db.add(nuevo_movimiento)
-    db.commit()
-    db.refresh(nuevo_movimiento)
-    
-    # 2. Crear la métrica vinculada
-    nueva_metrica = MetricaSatisfaccion(movimiento_id=nuevo_movimiento.id, nivel=nivel_satisfaccion)
-    db.add(nueva_metrica)
-    db.commit()
-    
-    return {"status": "exito", "id": nuevo_movimiento.id, "mensaje": "Gasto registrado con IA"}
+    try:
+        movimiento = MovimientoEntrada(tipo=tipo, descripcion=descripcion, monto=monto,
+                                       nivel_satisfaccion=nivel_satisfaccion, categoria=categoria,
+                                       comentario=comentario)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+
+    id_ = await _registrar(db, movimiento)
+    mensaje = "Gasto registrado con IA" if tipo == "GASTO" else "Ingreso registrado con IA"
+    return {"status": "exito", "id": id_, "mensaje": mensaje}
+
+# Alta con cuerpo JSON (mismo esquema que los lotes)
+@app.post("/movimientos")
+async def crear_movimiento(movimiento: MovimientoEntrada, db: AsyncSession = Depends(get_db_async)):
+    return {"status": "exito", "id": await _registrar(db, movimiento)}
+
+# INGESTA MASIVA (extractos bancarios): un commit por lote
+@app.post("/movimientos/lote", response_model=ResultadoIngesta)
+def ingresar_lote(movimientos: List[MovimientoEntrada],
+                  tamano_lote: int = Query(TAMANO_LOTE, ge=1, le=TAMANO_LOTE_MAXIMO),
+                  db: Session = Depends(get_db)):
+    lotes = list(ingerir(db, movimientos, tamano_lote))
+    return {"total_insertados": sum(l["insertados"] for l in lotes), "lotes": lotes}
+
+async def _lineas(flujo):
+    """Parte un flujo de bytes en líneas sin cargar el cuerpo completo."""
+    pendiente = b""
+    async for trozo in flujo:
+        pendiente += trozo
+        *lineas, pendiente = pendiente.split(b"\n")
+        for linea in lineas:
+            yield linea
+    if pendiente:
+        yield pendiente
+
+@app.post("/movimientos/lote/ndjson", response_model=ResultadoIngesta)
+async def ingresar_lote_ndjson(request: Request, tamano_lote: int = Query(TAMANO_LOTE, ge=1, le=TAMANO_LOTE_MAXIMO)):
+    """Igual que /movimientos/lote pero con un movimiento JSON por línea.
+
+    Las líneas inválidas se informan en `errores` y no detienen la carga.
+    """
+    db = SessionLocal()
+    lote, lotes, errores = [], [], []
+    try:
+        numero_linea = 0
+        async for linea in _lineas(request.stream()):
+            numero_linea += 1
+            if not linea.strip():
+                continue
+            try:
+                lote.append(MovimientoEntrada.model_validate_json(linea))
+            except ValidationError as e:
+                errores.append({"linea": numero_linea, "error": str(e)})
+                continue
+            if len(lote) >= tamano_lote:
+                lotes.append(await run_in_threadpool(procesar_lote, db, lote, len(lotes)))
+                lote = []
+        if lote:
+            lotes.append(await run_in_threadpool(procesar_lote, db, lote, len(lotes)))
+    finally:
+        db.close()
+    return {"total_insertados": sum(l["insertados"] for l in lotes), "lotes": lotes, "errores": errores}
+
+# Historial paginado por clave (orden, id): solo viaja la página pedida
+@app.get("/movimientos")
+async def listar_movimientos(
+    limite: int = Query(LIMITE_PAGINA, ge=1, le=LIMITE_MAXIMO),
+    cursor: Optional[str] = None,
+    orden: Literal["fecha", "monto", "satisfaccion", "descripcion"] = "fecha",
+    descendente: bool = True,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    tipo: Optional[Literal["GASTO", "INGRESO"]] = None,
+    categoria_id: Optional[int] = None,
+    nivel_min: Optional[int] = Query(None, ge=1, le=10),
+    nivel_max: Optional[int] = Query(None, ge=1, le=10),
+    texto: Optional[str] = Query(None, max_length=100),
+    db: AsyncSession = Depends(get_db_async),
+):
+    try:
+        posicion = decodificar_cursor(cursor, orden)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    filas, siguiente = await db.run_sync(
+        pagina_historial, limite, posicion, orden, descendente, desde=desde, hasta=hasta, tipo=tipo,
+        categoria_id=categoria_id, nivel_min=nivel_min, nivel_max=nivel_max, texto=texto,
+    )
+    return {"movimientos": [f._asdict() for f in filas], "siguiente": codificar_cursor(siguiente)}
 
 # INTERFAZ PARA VER ANALISIS (GET)
 @app.get("/ia/diagnostico")
-def obtener_diagnostico(db: Session = Depends(get_db)):
-    motor = MotorPsicometrico(db)
-    return motor.calcular_costo_insatisfaccion()
+async def obtener_diagnostico(umbral: int = 5, desde: Optional[datetime] = None, hasta: Optional[datetime] = None,
+                              db: AsyncSession = Depends(get_db_async)):
+    motor = MotorPsicometricoAsync(db)
+    return await cache.diagnosticos.obtener_async(
+        (umbral, desde, hasta),
+        lambda: motor.calcular_costo_insatisfaccion(umbral=umbral, fecha_inicio=desde, fecha_fin=hasta),
+    )
+
+# Gasto ineficiente por ventanas móviles y mes a mes
+@app.get("/ia/tendencias")
+async def obtener_tendencias(umbral: int = Query(5, ge=1, le=10), meses: int = Query(12, ge=1, le=120),
+                             db: AsyncSession = Depends(get_db_async)):
+    motor = MotorPsicometricoAsync(db)
+    return {
+        "ventanas": await motor.calcular_ventanas(umbral),
+        "promedio_mensual": await motor.promedio_mensual(umbral, meses),
+        "tendencia": await motor.tendencia_mensual(umbral, meses),
+    }
 
+# Porciones para gráficos de pastel: top por monto y "Otros", agregadas en la base
+@app.get("/resumen/top")
+def obtener_top(tipo: Literal["INGRESO", "GASTO"] = "GASTO",
+                agrupar: Literal["descripcion", "categoria"] = "descripcion",
+                limite: int = Query(TOP_PORCIONES, ge=1, le=TOP_PORCIONES_MAXIMO), db: Session = Depends(get_db)):
+    return top_por_tipo(db, tipo, agrupar, limite)
+
+# Aciertos y fallos de las cachés del proceso
+@app.get("/cache")
+def estado_cache():
+    return cache.estadisticas()
+
+# Patrones de gasto: cálculo vectorizado en CPU, por eso corre en el threadpool (def, no async)
+@app.get("/ia/patrones")
+def obtener_patrones(umbral: int = 5, db: Session = Depends(get_db)):
+    from app.ia.motor_ia import MotorIA # pandas solo si se usa: no retrasa el arranque
+
+    return MotorIA(db).analizar(umbral)
+
+# Cargos recurrentes según el estado guardado (solo lectura)
+@app.get("/ia/recurrencias")
+def obtener_recurrencias(umbral: int = 5, db: Session = Depends(get_db)):
+    return listar_recurrencias(db, umbral=umbral)
+
+# Procesa los gastos nuevos desde la última corrida y guarda el estado del detector
+@app.post("/ia/recurrencias/actualizar")
+def actualizar_recurrencias_ia(umbral: int = 5, db: Session = Depends(get_db)):
+    recurrentes = detectar_recurrencias(db, umbral=umbral)
+    db.commit()
+    return recurrentes
@@ -1,12 +1,13 @@
-from app.db.session import engine, Base, SessionLocal
-from app.models.movimiento import Movimiento
-from app.models.satisfaccion import MetricaSatisfaccion
+from app.db.session import SessionLocal, obtener_engine
+from app.db.migraciones import sincronizar_esquema
+from app.db.ingesta import despues_de_confirmar, registrar_movimiento
+from app.models.schemas import MovimientoEntrada
 
 def ejecutar_todo():
     # PASO A: Crear las tablas en SQL Server
     print("--- 1. Sincronizando Tablas ---")
     try:
-        Base.metadata.create_all(bind=engine)
+        sincronizar_esquema(obtener_engine())
         print("✅ Tablas listas en GestorFinanzas.")
     except Exception as e:
         print(f"❌ Error al crear tablas: {e}")
@@ -16,25 +17,20 @@ def ejecutar_todo():
     print("\n--- 2. Insertando Datos de Prueba ---")
     db = SessionLocal()
     try:
-        # Creamos un gasto de baja satisfacción (para probar la IA luego)
-        gasto = Movimiento(
-            tipo="GASTO", 
-            descripcion="Suscripción olvidada", 
-            monto=19.99
-        )
-        db.add(gasto)
-        db.commit()
-        db.refresh(gasto)
-
-        sat = MetricaSatisfaccion(
-            movimiento_id=gasto.id,
-            nivel=2,
+        # Creamos un gasto de baja satisfacción (para probar la IA luego).
+        # Mismo servicio que la API: movimiento, métrica y resumen en una transacción
+        gasto = MovimientoEntrada(
+            tipo="GASTO",
+            descripcion="Suscripción olvidada",
+            monto=19.99,
+            nivel_satisfaccion=2,
             comentario="No lo uso nunca, es un desperdicio."
         )
-        db.add(sat)
+        registrar_movimiento(db, gasto)
         db.commit()
+        despues_de_confirmar(db)
 
-        print(f"✅ ÉXITO: Registrado '{gasto.descripcion}' con satisfacción {sat.nivel}/10")
+        print(f"✅ ÉXITO: Registrado '{gasto.descripcion}' con satisfacción {gasto.nivel_satisfaccion}/10")
     except Exception as e:
         print(f"❌ Error al insertar datos: {e}")
     finally: